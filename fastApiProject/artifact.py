@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from hashlib import blake2b
+
+import numpy as np
+
+from scorer import LinearTextScorer
+
+FORMAT_VERSION = 1
+
+
+def token_hashes(tokens):
+    """Stable 64-bit hashes of tokens (Python's hash() is randomized per process)."""
+    digests = b"".join(blake2b(token.encode("utf-8"), digest_size=8).digest() for token in tokens)
+    return np.frombuffer(digests, dtype="<u8")
+
+
+class HashedVocabulary:
+    """Token table stored as a sorted array of 64-bit token hashes.
+
+    The position of a hash in the table is the token's column in the idf/coef arrays,
+    so a lookup is a vectorized binary search over a (memory-mapped) array instead of a
+    dict with hundreds of thousands of Python strings. An unknown token matching a
+    vocabulary hash has probability of about len(table) / 2**64.
+    """
+
+    def __init__(self, hashes):
+        self.hashes = hashes
+
+    def lookup(self, tokens):
+        """Column for each token, or -1 for tokens not in the vocabulary."""
+        if not tokens:
+            return np.empty(0, dtype=np.int64)
+        wanted = token_hashes(tokens)
+        positions = np.searchsorted(self.hashes, wanted)
+        positions[positions == len(self.hashes)] = 0
+        return np.where(self.hashes[positions] == wanted, positions, -1).astype(np.int64)
+
+    def __len__(self):
+        return len(self.hashes)
+
+
+def save_artifact(scorer, path):
+    """Write a scorer as a directory of flat .npy arrays plus a small meta.json."""
+    tokens = list(scorer.vocabulary.keys())
+    columns = np.fromiter(scorer.vocabulary.values(), dtype=np.int64, count=len(tokens))
+    hashes = token_hashes(tokens)
+
+    order = np.argsort(hashes, kind="stable")
+    hashes = hashes[order]
+    if len(hashes) > 1 and np.any(hashes[1:] == hashes[:-1]):
+        raise ValueError("Token hash collision in vocabulary; cannot build a hashed artifact")
+
+    os.makedirs(path, exist_ok=True)
+    # Reorder the weights so row i belongs to the i-th smallest token hash
+    np.save(os.path.join(path, "hashes.npy"), hashes)
+    np.save(os.path.join(path, "idf.npy"), scorer.idf[columns[order]])
+    np.save(os.path.join(path, "coef.npy"), scorer.coef[columns[order]])
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({
+            "format_version": FORMAT_VERSION,
+            "n_tokens": len(tokens),
+            "intercept": scorer.intercept,
+            "classes": scorer.classes.tolist(),
+            "token_pattern": scorer.token_pattern,
+            "lowercase": scorer.lowercase,
+        }, f, indent=2)
+
+
+def load_artifact(path, mmap=True):
+    """Open an artifact directory; with mmap the arrays are shared through the OS page cache."""
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta["format_version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model artifact version {meta['format_version']} in {path}")
+
+    mmap_mode = "r" if mmap else None
+    return LinearTextScorer(
+        vocabulary=HashedVocabulary(np.load(os.path.join(path, "hashes.npy"), mmap_mode=mmap_mode)),
+        idf=np.load(os.path.join(path, "idf.npy"), mmap_mode=mmap_mode),
+        coef=np.load(os.path.join(path, "coef.npy"), mmap_mode=mmap_mode),
+        intercept=meta["intercept"],
+        classes=meta["classes"],
+        token_pattern=meta["token_pattern"],
+        lowercase=meta["lowercase"],
+    )
+
+
+# Run in a fresh interpreter so nothing is already imported or cached
+_MEASURE_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import utils
+utils.warmup()
+seconds = time.perf_counter() - start
+status = dict(line.split(":", 1) for line in open("/proc/self/status") if line.startswith("Rss"))
+print(json.dumps({
+    "load_seconds": round(seconds, 3),
+    "rss_anon_mb": int(status["RssAnon"].split()[0]) / 1024,
+    "rss_file_mb": int(status["RssFile"].split()[0]) / 1024,
+}))
+"""
+
+
+def measure(env_overrides):
+    """Startup time and resident memory of a worker importing utils and loading the model.
+
+    RssAnon is private to each worker; RssFile pages of a memory-mapped artifact are
+    shared between every worker on the host.
+    """
+    env = dict(os.environ, **env_overrides)
+    output = subprocess.run(
+        [sys.executable, "-c", _MEASURE_SNIPPET],
+        env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or measure the memory-mappable sentiment model artifact.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="convert a joblib TF-IDF pipeline into an artifact directory")
+    build.add_argument("model", help="path to the joblib pipeline")
+    build.add_argument("output", help="artifact directory to write, e.g. sentiment_model")
+
+    compare = commands.add_parser("measure", help="compare worker startup time and memory for pickle vs artifact")
+    compare.add_argument("model", help="path to the joblib pipeline")
+    compare.add_argument("artifact", help="artifact directory built from the same model")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        import joblib
+
+        scorer = LinearTextScorer.from_pipeline(joblib.load(args.model))
+        save_artifact(scorer, args.output)
+        print(f"Wrote {len(scorer.vocabulary)} tokens to {args.output}")
+        return 0
+
+    missing = os.path.join(args.artifact, "does-not-exist")
+    results = {
+        # Point the artifact/scorer paths at nothing so utils falls back to the pickle
+        "pickle": measure({"SENTIMENT_MODEL_PATH": os.path.abspath(args.model),
+                           "SENTIMENT_ARTIFACT_PATH": missing, "SENTIMENT_SCORER_PATH": missing}),
+        "artifact": measure({"SENTIMENT_ARTIFACT_PATH": os.path.abspath(args.artifact)}),
+    }
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import asyncio
+
+
+class InferenceBatcher:
+    """Gathers concurrent prediction requests and runs them as one vectorized model call."""
+
+    def __init__(self, predict_batch, max_batch_size=64, max_wait_ms=5.0):
+        # predict_batch is a coroutine function taking a list of texts and returning
+        # one result per text, in order
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._worker = None
+        self._inflight = set()
+
+    def queue_depth(self):
+        """Texts waiting to be picked up into a batch."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        # Let batches that are already being predicted deliver their results
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+        # Fail whatever is still waiting so no caller hangs on shutdown
+        while not self._queue.empty():
+            self._fail([self._queue.get_nowait()])
+
+    @staticmethod
+    def _fail(batch):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("Inference batcher stopped"))
+
+    async def submit(self, text):
+        """Queue a single text and wait for its prediction."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((text, future))
+        return await future
+
+    async def submit_many(self, texts):
+        """Queue several texts at once; results come back in input order."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._queue.put_nowait((text, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        try:
+            await self._fill(batch, deadline)
+        except asyncio.CancelledError:
+            self._fail(batch)
+            raise
+        return batch
+
+    async def _fill(self, batch, deadline):
+        loop = asyncio.get_running_loop()
+        while len(batch) < self.max_batch_size:
+            # Take everything that is already queued before waiting for more
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # Predict in the background so the next batch can be collected meanwhile
+            task = asyncio.create_task(self._flush(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _flush(self, batch):
+        texts = [text for text, _ in batch]
+        try:
+            results = await self.predict_batch(texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            # The caller may have gone away (client disconnect) while we were predicting
+            if not future.done():
+                future.set_result(result)
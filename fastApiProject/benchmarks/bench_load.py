@@ -0,0 +1,82 @@
+"""In-process ASGI load generator for /analyze-feedback/.
+
+Drives the FastAPI app directly through httpx's ASGI transport (no network or server
+process), at a fixed concurrency, and reports throughput and latency percentiles.
+
+Run from fastApiProject/:  python benchmarks/bench_load.py --concurrency 64 --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stand_in_model import install_stand_in_model, synthetic_feedback
+from results import compare, percentiles, save_results
+
+
+async def run_load(app, texts, concurrency, total_requests, vendors):
+    import httpx
+
+    latencies = []
+    statuses = {}
+    counter = iter(range(total_requests))
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def worker():
+                for i in counter:
+                    payload = {"feedback": texts[i % len(texts)], "vendor_id": i % vendors}
+                    start = time.perf_counter()
+                    response = await client.post("/analyze-feedback/", json=payload)
+                    latencies.append(time.perf_counter() - start)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "seconds": elapsed,
+        "requests_per_sec": total_requests / elapsed,
+        "latency_ms": {name: value * 1000 for name, value in percentiles(latencies).items()},
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--vendors", type=int, default=1000)
+    parser.add_argument("--unique-texts", type=int, default=100_000,
+                        help="distinct feedback strings; fewer means more prediction cache hits")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/load-<time>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    install_stand_in_model()
+    # Imported after the stand-in model is installed, since utils reads its paths at import
+    import main as service
+
+    texts, _ = synthetic_feedback(args.unique_texts, seed=2)
+    results = asyncio.run(run_load(service.app, texts, args.concurrency, args.requests, args.vendors))
+    results["settings"] = {name: os.getenv(name) for name in (
+        "INFERENCE_BACKEND", "INFERENCE_WORKERS", "BATCH_MAX_SIZE", "BATCH_MAX_WAIT_MS", "METRICS_SAMPLE_RATE")}
+
+    path = save_results("load", results, args.output)
+    print(f"Saved {path}")
+    print(f"{results['requests_per_sec']:.0f} req/s, latency ms {results['latency_ms']}, "
+          f"status {results['status_codes']}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Microbenchmarks for clean_text, predict_sentiment(s) and get_top_vendors.
+
+Run from fastApiProject/:  python benchmarks/bench_micro.py [--baseline results/micro-....json]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stand_in_model import install_stand_in_model, synthetic_feedback
+from results import compare, save_results
+
+
+def bench(fn, min_seconds=0.5):
+    """Call fn repeatedly for at least min_seconds; returns microseconds per call and calls/sec."""
+    fn()
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        for _ in range(100):
+            fn()
+        calls += 100
+        elapsed = time.perf_counter() - start
+    return {"us_per_call": elapsed / calls * 1e6, "calls_per_sec": calls / elapsed}
+
+
+def run_coroutine(coro):
+    """Drive a coroutine that never actually suspends, without event loop overhead."""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("coroutine suspended")
+
+
+def bench_text(texts):
+    import utils
+
+    results = {}
+    texts = iter(texts * 1000)
+    results["clean_text"] = bench(lambda: utils.clean_text(next(texts)))
+
+    # Cold: the prediction cache is cleared before every call, so the model always runs
+    def cold():
+        utils.prediction_cache.clear()
+        utils.predict_sentiment(next(texts))
+
+    results["predict_sentiment_cold"] = bench(cold)
+    results["predict_sentiment_cached"] = bench(lambda: utils.predict_sentiment("good product"))
+
+    batch = [next(texts) for _ in range(64)]
+
+    def cold_batch():
+        utils.prediction_cache.clear()
+        utils.predict_sentiments(batch)
+
+    results["predict_sentiments_batch64_cold"] = bench(cold_batch)
+    return results
+
+
+def bench_top_vendors(sizes):
+    import main
+
+    results = {}
+    rng = random.Random(0)
+    for size in sizes:
+        scores = {}
+        for vendor_id in range(size):
+            total = rng.randint(1, 200)
+            scores[vendor_id] = {"positive": rng.randint(0, total), "total": total}
+
+        start = time.perf_counter()
+        main.vendor_ranking.rebuild(scores.items())
+        rebuild = time.perf_counter() - start
+
+        vendor_ids = iter(rng.choices(range(size), k=10 ** 6))
+
+        def update():
+            vendor_id = next(vendor_ids)
+            s = scores[vendor_id]
+            s["total"] += 1
+            main.vendor_ranking.update(vendor_id, s["positive"], s["total"])
+
+        results[str(size)] = {
+            "rebuild_seconds": rebuild,
+            "ranking_update": bench(update, min_seconds=0.3),
+            "top10": bench(lambda: run_coroutine(main.get_top_vendors(limit=10, offset=0, min_total=None)),
+                           min_seconds=0.3),
+            "top10_offset_1000": bench(
+                lambda: run_coroutine(main.get_top_vendors(limit=10, offset=1000, min_total=None)), min_seconds=0.3),
+            "top10_min_total_150": bench(
+                lambda: run_coroutine(main.get_top_vendors(limit=10, offset=0, min_total=150)), min_seconds=0.3),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vendors", type=int, nargs="+", default=[1000, 100_000, 1_000_000])
+    parser.add_argument("--output", help="result file (default: benchmarks/results/micro-<time>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    install_stand_in_model()
+    texts, _ = synthetic_feedback(1000, seed=1)
+
+    results = {"text": bench_text(texts), "top_vendors": bench_top_vendors(args.vendors)}
+    path = save_results("micro", results, args.output)
+    print(f"Saved {path}")
+    for group, values in results.items():
+        for name, value in values.items():
+            print(group, name, value)
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
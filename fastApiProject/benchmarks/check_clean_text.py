@@ -0,0 +1,72 @@
+"""Differential check: the optimized clean_text must match the three-pass one the model was trained with.
+
+Compares utils.clean_text and recommedation_model/preprocessing.clean_text against the
+original on hand-picked edge cases plus random strings built from URL, mention and
+punctuation fragments. Exits non-zero on the first mismatch.
+
+Run from fastApiProject/:  python benchmarks/check_clean_text.py [--samples 200000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(HERE)), "recommedation_model"))
+
+from stand_in_model import install_stand_in_model
+
+EDGE_CASES = [
+    "",
+    "plain text, no urls!",
+    "look@https://a.b c",
+    "a@www.foo.com b",
+    "@@a @ a@ @_x @1 mail@me.com",
+    "see http://x.y/z?q=1 and www.a.b",
+    "HTTP://UPPER.CASE Www.Mixed.com",
+    "httpnotaurl wwwnotaurl https",
+    "line1\nhttp://a\n@b\r\nc",
+    "café @josé naïve 😀 http://ü.de",
+]
+FRAGMENTS = ["http", "https://", "www", ".", "@", "@user", "a", "b1", "_", " ", "\n", "!", "/", ":", "é", "😀", "www.x"]
+
+
+def original_clean_text(text):
+    # The clean_text from the training notebook, kept verbatim as the reference
+    text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'@\w+', '', text)
+    text = re.sub(r'\W', ' ', text)
+    return text.lower()
+
+
+def random_texts(n, seed=0):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield "".join(rng.choices(FRAGMENTS, k=rng.randint(0, 12)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=200_000)
+    args = parser.parse_args()
+
+    install_stand_in_model()
+    import preprocessing
+    import utils
+
+    checked = 0
+    for text in [*EDGE_CASES, *random_texts(args.samples)]:
+        expected = original_clean_text(text)
+        for name, clean_text in (("utils", utils.clean_text), ("preprocessing", preprocessing.clean_text)):
+            actual = clean_text(text)
+            if actual != expected:
+                print(f"{name}.clean_text({text!r}) = {actual!r}, expected {expected!r}")
+                sys.exit(1)
+        checked += 1
+    print(f"{checked} texts match the original clean_text")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Saving benchmark results as JSON and comparing them with an earlier run."""
+import json
+import os
+import platform
+import time
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentiles(samples, quantiles=(0.5, 0.95, 0.99)):
+    """Nearest-rank percentiles of a list of samples, keyed p50/p95/p99."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {f"p{round(q * 100)}": 0.0 for q in quantiles}
+    return {
+        f"p{round(q * 100)}": ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+        for q in quantiles
+    }
+
+
+def save_results(name, results, output=None):
+    """Write results with some environment details; returns the file path."""
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w") as f:
+        json.dump({
+            "benchmark": name,
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }, f, indent=2)
+    return output
+
+
+def compare(current, baseline_path):
+    """Print how each numeric result moved relative to a saved baseline run."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+
+    def walk(now, before, prefix=""):
+        for key, value in now.items():
+            old = before.get(key) if isinstance(before, dict) else None
+            if isinstance(value, dict):
+                walk(value, old or {}, f"{prefix}{key}.")
+            elif isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+                print(f"{prefix}{key}: {old:.6g} -> {value:.6g} ({(value - old) / old:+.1%})")
+
+    walk(current, baseline)
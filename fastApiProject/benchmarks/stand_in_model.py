@@ -0,0 +1,45 @@
+"""Tiny locally trained sentiment model so the benchmarks run offline without the real pickle."""
+import os
+import random
+import tempfile
+
+POSITIVE_WORDS = "good great love nice awesome happy best excellent fast perfect".split()
+NEGATIVE_WORDS = "bad awful hate poor terrible sad worst broken slow late".split()
+FILLER_WORDS = "the product item delivery seller was is it and very so really this order".split()
+
+
+def synthetic_feedback(n, seed=0):
+    """Return (texts, labels) of short tweet-like reviews."""
+    rng = random.Random(seed)
+    texts, labels = [], []
+    for _ in range(n):
+        label = rng.random() < 0.5
+        words = rng.choices(POSITIVE_WORDS if label else NEGATIVE_WORDS, k=2)
+        words += rng.choices(FILLER_WORDS, k=rng.randint(3, 15))
+        rng.shuffle(words)
+        if rng.random() < 0.2:
+            words.append("@user" + str(rng.randint(0, 999)))
+        if rng.random() < 0.1:
+            words.append("http://example.com/" + str(rng.randint(0, 999)))
+        texts.append(" ".join(words))
+        labels.append(int(label))
+    return texts, labels
+
+
+def install_stand_in_model(directory=None):
+    """Train the stand-in model and point utils at it. Call before importing utils."""
+    from joblib import dump
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+
+    directory = directory or tempfile.mkdtemp(prefix="sentiment-bench-")
+    path = os.path.join(directory, "stand_in_model.pkl")
+    texts, labels = synthetic_feedback(5000)
+    dump(make_pipeline(TfidfVectorizer(), LogisticRegression(max_iter=1000)).fit(texts, labels), path)
+
+    missing = os.path.join(directory, "missing")
+    os.environ["SENTIMENT_MODEL_PATH"] = path
+    os.environ["SENTIMENT_ARTIFACT_PATH"] = missing
+    os.environ["SENTIMENT_SCORER_PATH"] = missing
+    return path
@@ -0,0 +1,41 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class ExecutorOverloaded(Exception):
+    """Raised when the inference queue is full and the job was not accepted."""
+
+
+class InferenceExecutor:
+    """Runs CPU-bound inference off the event loop on a thread or process pool."""
+
+    def __init__(self, backend="thread", workers=4, max_pending=256, initializer=None):
+        if backend == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference",
+                                            initializer=initializer)
+        elif backend == "process":
+            # Each worker process imports utils and loads its own copy of the model
+            self._pool = ProcessPoolExecutor(max_workers=workers, initializer=initializer)
+        else:
+            raise ValueError(f"Unknown inference backend: {backend!r} (expected 'thread' or 'process')")
+
+        self.backend = backend
+        self.workers = workers
+        self.max_pending = max_pending
+        # Jobs submitted but not finished yet (running + queued); only touched from the event loop
+        self.pending = 0
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool and await the result without blocking the loop."""
+        if self.pending >= self.max_pending:
+            raise ExecutorOverloaded(f"Inference queue is full ({self.max_pending} pending jobs)")
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, fn, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,47 @@
+import json
+
+
+class LineTooLong(ValueError):
+    """Raised when an NDJSON line grows past the configured limit without a newline."""
+
+
+async def iter_lines(chunks, max_line_bytes=64 * 1024):
+    """Split an async stream of byte chunks into lines without buffering the whole body."""
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            yield bytes(buffer[start:end])
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            raise LineTooLong(f"NDJSON line longer than {max_line_bytes} bytes")
+    if buffer:
+        yield bytes(buffer)
+
+
+async def iter_chunks(lines, parse, chunk_size):
+    """Group parsed lines into lists of (line_number, record, error) of at most chunk_size.
+
+    ``parse`` turns a decoded JSON object into a record or raises ValueError/TypeError;
+    blank lines are skipped, malformed ones are reported with their error instead.
+    """
+    chunk = []
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            chunk.append((line_number, parse(json.loads(line)), None))
+        except (ValueError, TypeError) as e:
+            chunk.append((line_number, None, " ".join(str(e).split())))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
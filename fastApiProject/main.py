@@ -1,8 +1,110 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from utils import predict_sentiment
+from batching import InferenceBatcher
+from executor import ExecutorOverloaded, InferenceExecutor
+from ingest import LineTooLong, iter_chunks, iter_lines
+from metrics import MetricsMiddleware, metrics
+from ranking import VendorRanking
+from score_store import open_score_store
+from windows import WindowedScores
+from utils import prediction_cache, predict_sentiments, warmup
+
+# MODEL_WARMUP=1 loads the model at startup instead of on the first request
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "0") == "1"
+
+# CPU-bound inference runs on a worker pool so the event loop only awaits results
+executor = InferenceExecutor(
+    backend=os.getenv("INFERENCE_BACKEND", "thread"),
+    workers=int(os.getenv("INFERENCE_WORKERS", "4")),
+    max_pending=int(os.getenv("INFERENCE_MAX_PENDING", "256")),
+    initializer=warmup if MODEL_WARMUP else None,
+)
+
+
+# Rankings over every vendor are rebuilt on their own thread, so a recompute neither blocks
+# the event loop nor waits behind inference (which may run in other processes)
+ranking_executor = InferenceExecutor(
+    backend="thread",
+    workers=1,
+    max_pending=int(os.getenv("RANKING_MAX_PENDING", "256")),
+)
+
+
+async def classify(texts):
+    return await executor.run(predict_sentiments, texts)
+
+
+# Requests arriving within the same window are classified together in one model call
+batcher = InferenceBatcher(
+    classify,
+    max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "64")),
+    max_wait_ms=float(os.getenv("BATCH_MAX_WAIT_MS", "5")),
+)
+
+# Vendor feedback scores; SCORE_STORE=sqlite persists them with batched write-behind flushes,
+# SCORE_STORE=shm shares one table between all uvicorn workers on the host
+score_store = open_score_store(
+    backend=os.getenv("SCORE_STORE", "memory"),
+    path=os.getenv("SCORE_DB_PATH", "vendor_scores.db"),
+    flush_interval=float(os.getenv("SCORE_FLUSH_INTERVAL", "1.0")),
+    flush_threshold=int(os.getenv("SCORE_FLUSH_THRESHOLD", "1000")),
+    shm_name=os.getenv("SCORE_SHM_NAME", "vendor_scores"),
+    shm_capacity=int(os.getenv("SCORE_SHM_CAPACITY", str(1 << 20))),
+    shm_ranking_ttl=float(os.getenv("SCORE_SHM_RANKING_TTL", "1.0")),
+)
+# A shared table sees every worker's updates, so it is ranked directly instead of
+# through this worker's local index
+SHARED_SCORES = hasattr(score_store, "top")
 
-app = FastAPI()
+# Sorted view of vendors for /top-vendors/; vendors with fewer reviews than this are not ranked,
+# so it is also the smallest min_total /top-vendors/ accepts
+TOP_VENDORS_MIN_TOTAL = int(os.getenv("TOP_VENDORS_MIN_TOTAL", "5"))
+vendor_ranking = VendorRanking(min_total=TOP_VENDORS_MIN_TOTAL)
+
+# Recent sentiment per vendor (hourly and daily rings plus a decayed score) for /top-vendors/?window=
+windowed_scores = WindowedScores(
+    hourly_buckets=int(os.getenv("WINDOW_HOURLY_BUCKETS", "24")),
+    daily_buckets=int(os.getenv("WINDOW_DAILY_BUCKETS", "30")),
+    half_life_hours=float(os.getenv("WINDOW_DECAY_HALF_LIFE_HOURS", "72")),
+    ranking_ttl=float(os.getenv("WINDOW_RANKING_TTL", "30")),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MODEL_WARMUP:
+        warmup()
+    score_store.start()
+    if not SHARED_SCORES:
+        vendor_ranking.rebuild(score_store.items())
+    await batcher.start()
+    yield
+    await batcher.stop()
+    executor.shutdown()
+    ranking_executor.shutdown()
+    score_store.close()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+metrics.register("batcher_queue_depth", batcher.queue_depth, help="Texts waiting to be batched.")
+metrics.register("executor_pending_jobs", lambda: executor.pending, help="Inference jobs running or queued.")
+metrics.register("score_store_pending_writes", score_store.pending_writes,
+                 help="Vendor score increments not yet persisted.")
+metrics.register("vendors_ranked", lambda: len(vendor_ranking), help="Vendors in the top-vendors index.")
+for counter in ("hits", "misses", "evictions"):
+    metrics.register(f"prediction_cache_{counter}_total", lambda counter=counter: getattr(prediction_cache, counter),
+                     kind="counter", help=f"Prediction cache {counter}.")
 #run this command to start the api    fastapi dev main.py
 
 # Define the data model for feedback input
@@ -11,41 +113,174 @@ class FeedbackInput(BaseModel):
     vendor_id: int
 
 
-# In-memory storage for feedback scores by vendor (for demonstration) migrate it to a db for prod.
-vendor_feedback_scores = {}
+def update_vendor(vendor_id: int, positive: int, total: int):
+    # Increment feedback scores and move the vendor in the all-time and windowed rankings
+    with metrics.timer("store_update"):
+        scores = score_store.increment(vendor_id, positive, total)
+    if not SHARED_SCORES:
+        with metrics.timer("ranking_update"):
+            vendor_ranking.update(vendor_id, scores["positive"], scores["total"])
+    with metrics.timer("window_update"):
+        windowed_scores.record(vendor_id, positive, total)
+
+
+def record_feedback(vendor_id: int, sentiment: str):
+    # Increment feedback scores based on sentiment
+    update_vendor(vendor_id, 1 if sentiment == "Good" else 0, 1)
 
 
 @app.post("/analyze-feedback/")
 async def analyze_feedback(feedback: FeedbackInput):
-    sentiment = predict_sentiment(feedback.feedback)
+    try:
+        sentiment = await batcher.submit(feedback.feedback)
+    except ExecutorOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
     vendor_id = feedback.vendor_id
+    record_feedback(vendor_id, sentiment)
 
-    # Update vendor feedback scores
-    if vendor_id not in vendor_feedback_scores:
-        vendor_feedback_scores[vendor_id] = {"positive": 0, "total": 0}
+    # JSONResponse renders the body on construction, so this times serialization
+    with metrics.timer("serialize"):
+        return JSONResponse({
+            "vendor_id": vendor_id,
+            "feedback": feedback.feedback,
+            "sentiment": sentiment
+        })
 
-    # Increment feedback scores based on sentiment
-    if sentiment == "Good":
-        vendor_feedback_scores[vendor_id]["positive"] += 1
-    vendor_feedback_scores[vendor_id]["total"] += 1
 
-    return {
-        "vendor_id": vendor_id,
-        "feedback": feedback.feedback,
-        "sentiment": sentiment
-    }
+@app.post("/analyze-feedback/batch")
+async def analyze_feedback_batch(feedbacks: List[FeedbackInput]):
+    try:
+        sentiments = await batcher.submit_many([item.feedback for item in feedbacks])
+    except ExecutorOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    results = []
+    for item, sentiment in zip(feedbacks, sentiments):
+        record_feedback(item.vendor_id, sentiment)
+        results.append({
+            "vendor_id": item.vendor_id,
+            "feedback": item.feedback,
+            "sentiment": sentiment
+        })
+    with metrics.timer("serialize"):
+        return JSONResponse(results)
+
+
+async def classify_chunk(texts):
+    # Bulk ingestion waits for the pool instead of failing the upload when it is busy
+    while True:
+        try:
+            return await classify(texts)
+        except ExecutorOverloaded:
+            await asyncio.sleep(0.05)
+
+
+@app.post("/analyze-feedback/stream")
+async def analyze_feedback_stream(
+    request: Request,
+    mode: Literal["summary", "lines"] = "summary",
+    chunk_size: int = Query(1000, ge=1, le=10000),
+):
+    """Backfill vendor scores from an NDJSON body of {"feedback", "vendor_id"} lines.
+
+    The body is read incrementally and classified chunk by chunk, so memory stays flat
+    however large the upload is. mode=lines returns one NDJSON result per input line
+    (spooled to a temporary file, not held in memory) followed by a summary line.
+    """
+    started = time.perf_counter()
+    summary = {"lines": 0, "classified": 0, "positive": 0, "errors": 0}
+    vendors = set()
+    output = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+b") if mode == "lines" else None
+
+    try:
+        async for chunk in iter_chunks(iter_lines(request.stream()), lambda obj: FeedbackInput(**obj), chunk_size):
+            records = [(line, record) for line, record, error in chunk if error is None]
+            sentiments = await classify_chunk([record.feedback for _, record in records]) if records else []
+
+            # Apply the chunk to the vendor aggregates with one update per vendor
+            deltas = {}
+            for (_, record), sentiment in zip(records, sentiments):
+                delta = deltas.setdefault(record.vendor_id, [0, 0])
+                delta[0] += sentiment == "Good"
+                delta[1] += 1
+            for vendor_id, (positive, total) in deltas.items():
+                update_vendor(vendor_id, positive, total)
+                summary["positive"] += positive
+            vendors.update(deltas)
+
+            summary["lines"] += len(chunk)
+            summary["classified"] += len(records)
+            summary["errors"] += len(chunk) - len(records)
+
+            if output is not None:
+                results = iter(sentiments)
+                for line, record, error in chunk:
+                    if error is None:
+                        item = {"line": line, "vendor_id": record.vendor_id, "sentiment": next(results)}
+                    else:
+                        item = {"line": line, "error": error}
+                    output.write(json.dumps(item).encode() + b"\n")
+    except LineTooLong as e:
+        if output is not None:
+            output.close()
+        raise HTTPException(status_code=413, detail=str(e))
+
+    summary["vendors"] = len(vendors)
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    if output is None:
+        return summary
+
+    output.write(json.dumps({"summary": summary}).encode() + b"\n")
+    output.seek(0)
+
+    def stream_results():
+        with output:
+            while True:
+                block = output.read(64 * 1024)
+                if not block:
+                    break
+                yield block
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
 
 
 @app.get("/top-vendors/")
-async def get_top_vendors():
-    # Calculate positive feedback ratio for each vendor
-    vendor_ranking = {
-        vendor_id: scores["positive"] / scores["total"]
-        for vendor_id, scores in vendor_feedback_scores.items()
-        if scores["total"] > 0
-    }
-
-    # Sort vendors by positive feedback ratio
-    ranked_vendors = sorted(vendor_ranking.items(), key=lambda x: x[1], reverse=True)
-    return ranked_vendors
+async def get_top_vendors(
+    limit: int = Query(10, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    min_total: Optional[int] = Query(None, ge=TOP_VENDORS_MIN_TOTAL,
+                                     description="Fewest reviews a ranked vendor needs; defaults to the minimum"),
+    window: str = "all",
+):
+    if window != "all":
+        # Recent windows (e.g. 24h, 7d) or the exponentially decayed score
+        try:
+            return await ranking_executor.run(windowed_scores.top, window, limit, offset,
+                                              min_total or TOP_VENDORS_MIN_TOTAL)
+        except ExecutorOverloaded as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except KeyError:
+            valid = ", ".join(["all", *windowed_scores.windows, "decay"])
+            raise HTTPException(status_code=400, detail=f"Unknown window {window!r}; expected one of: {valid}")
+
+    if SHARED_SCORES:
+        try:
+            return await ranking_executor.run(score_store.top, limit, offset, min_total or TOP_VENDORS_MIN_TOTAL)
+        except ExecutorOverloaded as e:
+            raise HTTPException(status_code=503, detail=str(e))
+
+    # Vendors sorted by positive feedback ratio, maintained incrementally by record_feedback
+    return vendor_ranking.top(limit=limit, offset=offset, min_total=min_total)
+
+
+@app.get("/cache-stats/")
+async def get_cache_stats():
+    # Counters of this process's prediction cache (each process-pool worker keeps its own)
+    return prediction_cache.stats()
+
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    # Prometheus text format; with INFERENCE_BACKEND=process the inference stages are
+    # timed inside the worker processes and do not show up here
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,180 @@
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+# Histogram bucket upper bounds in seconds, 10us .. 5s
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+QUANTILES = (0.5, 0.95, 0.99)
+
+_NOT_SAMPLED = nullcontext()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with Prometheus-style quantile estimates."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        # One extra slot for observations above the last bucket (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket (like histogram_quantile)."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class RateMeter:
+    """Events per second over a sliding window of one-second slots."""
+
+    def __init__(self, window=60):
+        self.window = window
+        self.total = 0
+        self._slots = [0] * window
+        self._slot_seconds = [0] * window
+        self._lock = threading.Lock()
+
+    def mark(self, n=1):
+        second = int(time.monotonic())
+        slot = second % self.window
+        with self._lock:
+            if self._slot_seconds[slot] != second:
+                self._slot_seconds[slot] = second
+                self._slots[slot] = 0
+            self._slots[slot] += n
+            self.total += n
+
+    def rate(self):
+        now = int(time.monotonic())
+        with self._lock:
+            # Only full seconds inside the window count; the current second is still filling up
+            events = sum(
+                count for count, second in zip(self._slots, self._slot_seconds)
+                if now - self.window < second < now
+            )
+        return events / (self.window - 1)
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """In-process per-stage latency histograms, request rate and gauges for /metrics.
+
+    ``sample_rate`` is the fraction of stage timings that are recorded; at 0 a timer is a
+    shared no-op context manager, so instrumentation can stay in the hot path.
+    """
+
+    def __init__(self, namespace="sentiment", sample_rate=1.0):
+        self.namespace = namespace
+        self.sample_rate = sample_rate
+        self.requests = RateMeter()
+        self._stages = {}
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def timer(self, stage):
+        if self.sample_rate < 1.0 and (self.sample_rate <= 0.0 or random.random() >= self.sample_rate):
+            return _NOT_SAMPLED
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(stage, Histogram())
+        return _Timer(histogram)
+
+    def register(self, name, fn, kind="gauge", help=""):
+        """Expose a value read at scrape time, e.g. a queue depth or a cache counter."""
+        self._callbacks.append((name, fn, kind, help))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        ns = self.namespace
+        lines = [
+            f"# HELP {ns}_requests_total HTTP requests received.",
+            f"# TYPE {ns}_requests_total counter",
+            f"{ns}_requests_total {self.requests.total}",
+            f"# HELP {ns}_requests_per_second Request rate over the last minute.",
+            f"# TYPE {ns}_requests_per_second gauge",
+            f"{ns}_requests_per_second {self.requests.rate():.3f}",
+            f"# HELP {ns}_stage_seconds Latency of each request stage (sampled).",
+            f"# TYPE {ns}_stage_seconds histogram",
+        ]
+        stages = sorted(self._stages.items())
+        for stage, histogram in stages:
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{ns}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{ns}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{ns}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.9f}')
+            lines.append(f'{ns}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+        lines.append(f"# HELP {ns}_stage_seconds_quantile Estimated p50/p95/p99 latency of each stage.")
+        lines.append(f"# TYPE {ns}_stage_seconds_quantile gauge")
+        for stage, histogram in stages:
+            for q in QUANTILES:
+                lines.append(f'{ns}_stage_seconds_quantile{{stage="{stage}",quantile="{q}"}} '
+                             f'{histogram.quantile(q):.9f}')
+
+        for name, fn, kind, help in self._callbacks:
+            lines.append(f"# HELP {ns}_{name} {help}")
+            lines.append(f"# TYPE {ns}_{name} {kind}")
+            lines.append(f"{ns}_{name} {fn()}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware counting requests and timing them end to end."""
+
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        self.metrics.requests.mark()
+        with self.metrics.timer("request"):
+            await self.app(scope, receive, send)
+
+
+# METRICS_SAMPLE_RATE=0.01 records one stage timing in a hundred; 0 turns timing off
+metrics = Metrics(sample_rate=float(os.getenv("METRICS_SAMPLE_RATE", "1.0")))
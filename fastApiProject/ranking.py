@@ -0,0 +1,131 @@
+from bisect import bisect_left, insort
+from itertools import chain, islice
+
+
+class SortedKeys:
+    """Sorted sequence stored as a list of small sorted buckets.
+
+    Inserting into or deleting from one flat list moves every later element (a memmove of
+    the whole tail), which dominates at a million vendors. With buckets of about ``load``
+    keys an update is two binary searches plus a memmove inside a single bucket.
+    """
+
+    def __init__(self, keys=(), load=1000):
+        keys = sorted(keys)
+        self._load = load
+        self._buckets = [keys[i:i + load] for i in range(0, len(keys), load)]
+        # Largest key of each bucket, used to find the bucket a key belongs to
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(keys)
+
+    def add(self, key):
+        self._len += 1
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            return
+
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            self._buckets[i].append(key)
+            self._maxes[i] = key
+        else:
+            insort(self._buckets[i], key)
+
+        bucket = self._buckets[i]
+        if len(bucket) > 2 * self._load:
+            self._buckets[i:i + 1] = [bucket[:self._load], bucket[self._load:]]
+            self._maxes[i:i + 1] = [bucket[self._load - 1], bucket[-1]]
+
+    def remove(self, key):
+        i = bisect_left(self._maxes, key)
+        bucket = self._buckets[i]
+        del bucket[bisect_left(bucket, key)]
+        self._len -= 1
+        if bucket:
+            self._maxes[i] = bucket[-1]
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+
+    def slice(self, start, stop):
+        """Keys at positions start..stop-1."""
+        for i, bucket in enumerate(self._buckets):
+            if start < len(bucket):
+                rest = chain.from_iterable(islice(self._buckets, i + 1, None))
+                return list(islice(chain(bucket[start:], rest), stop - start))
+            start -= len(bucket)
+            stop -= len(bucket)
+        return []
+
+    def __iter__(self):
+        return chain.from_iterable(self._buckets)
+
+    def __len__(self):
+        return self._len
+
+
+class VendorRanking:
+    """Vendors kept sorted by positive feedback ratio, updated on every score change.
+
+    Only vendors with at least ``min_total`` reviews are indexed, so a vendor with a
+    single positive review does not float to the top. Updates are a bucketed binary
+    search; reading a page at the index threshold is a slice.
+    """
+
+    def __init__(self, min_total=1):
+        self.min_total = max(min_total, 1)
+        # Sorted keys (-ratio, -total, vendor_id): best ratio first, more reviews breaks ties
+        self._order = SortedKeys()
+        # vendor_id -> its current key in _order
+        self._keys = {}
+
+    def rebuild(self, scores):
+        """Rebuild the index from (vendor_id, {"positive", "total"}) pairs, e.g. at startup."""
+        self._keys = {
+            vendor_id: self._key(vendor_id, s["positive"], s["total"])
+            for vendor_id, s in scores
+            if s["total"] >= self.min_total
+        }
+        self._order = SortedKeys(self._keys.values())
+
+    def update(self, vendor_id, positive, total):
+        old = self._keys.pop(vendor_id, None)
+        if old is not None:
+            self._order.remove(old)
+        if total >= self.min_total:
+            key = self._key(vendor_id, positive, total)
+            self._order.add(key)
+            self._keys[vendor_id] = key
+
+    def top(self, limit=10, offset=0, min_total=None):
+        """Return up to ``limit`` (vendor_id, ratio) pairs, best first, skipping ``offset``.
+
+        Vendors below the index threshold are not indexed, so a smaller ``min_total`` is an error.
+        """
+        if min_total is not None and min_total < self.min_total:
+            raise ValueError(f"min_total must be at least {self.min_total}, the index threshold")
+        if min_total is None or min_total == self.min_total:
+            page = self._order.slice(offset, offset + limit)
+        else:
+            # Stricter than the index threshold: walk from the top and filter
+            page = []
+            skipped = 0
+            for key in self._order:
+                if -key[1] < min_total:
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                page.append(key)
+                if len(page) == limit:
+                    break
+        return [(vendor_id, abs(neg_ratio)) for neg_ratio, _, vendor_id in page]
+
+    def __len__(self):
+        return len(self._order)
+
+    @staticmethod
+    def _key(vendor_id, positive, total):
+        return (-positive / total, -total, vendor_id)
@@ -0,0 +1,162 @@
+import logging
+import sqlite3
+import threading
+
+
+class ScoreStore:
+    """Vendor positive/total feedback counters; reads are always served from memory."""
+
+    def __init__(self):
+        # vendor_id -> {"positive": int, "total": int}
+        self._scores = {}
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def increment(self, vendor_id, positive, total=1):
+        """Add to a vendor's counters and return its updated scores."""
+        scores = self._scores.get(vendor_id)
+        if scores is None:
+            scores = self._scores[vendor_id] = {"positive": 0, "total": 0}
+        scores["positive"] += positive
+        scores["total"] += total
+        return scores
+
+    def get(self, vendor_id):
+        return self._scores.get(vendor_id)
+
+    def pending_writes(self):
+        """Increments buffered in memory but not yet persisted."""
+        return 0
+
+    def items(self):
+        return self._scores.items()
+
+    def __len__(self):
+        return len(self._scores)
+
+
+class MemoryScoreStore(ScoreStore):
+    """Process-local counters, lost on restart (the original demo behaviour)."""
+
+
+class SQLiteScoreStore(ScoreStore):
+    """Write-behind store: increments are buffered and flushed to SQLite (WAL) in batches.
+
+    The request path only touches memory. A background thread writes the buffered deltas
+    in one transaction every ``flush_interval`` seconds, or sooner once ``flush_threshold``
+    increments are waiting. Deltas are applied with an upsert, so several workers can share
+    one database file without overwriting each other's counts.
+    """
+
+    def __init__(self, path, flush_interval=1.0, flush_threshold=1000):
+        super().__init__()
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+        # vendor_id -> [positive, total] deltas that are not on disk yet
+        self._pending = {}
+        self._pending_count = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._conn = None
+        self._thread = None
+
+    def start(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vendor_scores ("
+            "vendor_id INTEGER PRIMARY KEY, positive INTEGER NOT NULL, total INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+        # Warm start: load the persisted aggregates before serving any request
+        for vendor_id, positive, total in self._conn.execute(
+            "SELECT vendor_id, positive, total FROM vendor_scores"
+        ):
+            self._scores[vendor_id] = {"positive": positive, "total": total}
+
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="score-store-flush", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if self._thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        if self._conn is not None:
+            self.flush()
+            self._conn.close()
+            self._conn = None
+
+    def increment(self, vendor_id, positive, total=1):
+        with self._lock:
+            scores = super().increment(vendor_id, positive, total)
+            delta = self._pending.get(vendor_id)
+            if delta is None:
+                delta = self._pending[vendor_id] = [0, 0]
+            delta[0] += positive
+            delta[1] += total
+            self._pending_count += 1
+            full = self._pending_count >= self.flush_threshold
+        if full:
+            self._wake.set()
+        return scores
+
+    def pending_writes(self):
+        return self._pending_count
+
+    def flush(self):
+        """Write all buffered deltas to disk in a single transaction."""
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            self._pending_count = 0
+
+        rows = [(vendor_id, positive, total) for vendor_id, (positive, total) in pending.items()]
+        try:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO vendor_scores (vendor_id, positive, total) VALUES (?, ?, ?) "
+                    "ON CONFLICT(vendor_id) DO UPDATE SET "
+                    "positive = positive + excluded.positive, total = total + excluded.total",
+                    rows,
+                )
+        except sqlite3.Error as e:
+            # Keep the deltas so the next flush retries them
+            logging.warning(f"Flushing vendor scores failed: {e}")
+            with self._lock:
+                for vendor_id, positive, total in rows:
+                    delta = self._pending.setdefault(vendor_id, [0, 0])
+                    delta[0] += positive
+                    delta[1] += total
+                    self._pending_count += 1
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+def open_score_store(backend="memory", path="vendor_scores.db", flush_interval=1.0, flush_threshold=1000,
+                     shm_name="vendor_scores", shm_capacity=1 << 20, shm_ranking_ttl=1.0):
+    if backend == "memory":
+        return MemoryScoreStore()
+    if backend == "sqlite":
+        return SQLiteScoreStore(path, flush_interval=flush_interval, flush_threshold=flush_threshold)
+    if backend == "shm":
+        from shared_scores import SharedMemoryScoreStore
+
+        return SharedMemoryScoreStore(name=shm_name, capacity=shm_capacity, ranking_ttl=shm_ranking_ttl)
+    raise ValueError(f"Unknown score store backend: {backend!r} (expected 'memory', 'sqlite' or 'shm')")
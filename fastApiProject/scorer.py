@@ -0,0 +1,167 @@
+import argparse
+import re
+import sys
+
+import numpy as np
+
+
+class UnsupportedModel(ValueError):
+    """Raised when a pipeline cannot be reproduced exactly by LinearTextScorer."""
+
+
+class LinearTextScorer:
+    """TF-IDF + binary linear classifier evaluated directly in NumPy.
+
+    Reproduces ``make_pipeline(TfidfVectorizer(), LogisticRegression()).predict`` for the
+    default word-unigram, l2-normalized vectorizer: tokenize, look tokens up in the
+    vocabulary, then one sparse dot product per document. It skips sklearn's input
+    validation and sparse matrix construction, which dominate the cost of small batches.
+    """
+
+    def __init__(self, vocabulary, idf, coef, intercept, classes,
+                 token_pattern=r"(?u)\b\w\w+\b", lowercase=True):
+        # token -> column index into idf/coef, or any object with a batch lookup(tokens) method
+        self.vocabulary = vocabulary
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.classes = np.asarray(classes)
+        self.token_pattern = token_pattern
+        self.lowercase = lowercase
+        self._token_re = re.compile(token_pattern)
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """Extract vocabulary, idf weights, coefficients and intercept from a fitted pipeline."""
+        vectorizer = pipeline.steps[0][1]
+        classifier = pipeline.steps[-1][1]
+
+        if len(pipeline.steps) != 2 or not hasattr(vectorizer, "idf_") or not hasattr(classifier, "coef_"):
+            raise UnsupportedModel("Expected a fitted TfidfVectorizer -> linear classifier pipeline")
+        if (vectorizer.analyzer != "word" or tuple(vectorizer.ngram_range) != (1, 1)
+                or vectorizer.tokenizer is not None or vectorizer.preprocessor is not None
+                or vectorizer.strip_accents is not None or vectorizer.binary
+                or vectorizer.sublinear_tf or vectorizer.norm != "l2" or not vectorizer.use_idf):
+            raise UnsupportedModel("Only the default word-unigram, l2-normalized TF-IDF settings are supported")
+        if classifier.coef_.shape[0] != 1:
+            raise UnsupportedModel("Only binary classifiers are supported")
+
+        return cls(
+            vocabulary=dict(vectorizer.vocabulary_),
+            idf=vectorizer.idf_,
+            coef=classifier.coef_[0],
+            intercept=classifier.intercept_[0],
+            classes=classifier.classes_,
+            token_pattern=vectorizer.token_pattern,
+            lowercase=vectorizer.lowercase,
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        tokens = data["tokens"].tolist()
+        return cls(
+            vocabulary=dict(zip(tokens, data["columns"].tolist())),
+            idf=data["idf"],
+            coef=data["coef"],
+            intercept=data["intercept"][0],
+            classes=data["classes"],
+            token_pattern=str(data["token_pattern"][0]),
+            lowercase=bool(data["lowercase"][0]),
+        )
+
+    def save(self, path):
+        if not isinstance(self.vocabulary, dict):
+            raise TypeError("Only dict vocabularies can be saved as .npz; use artifact.save_artifact")
+        np.savez(
+            path,
+            tokens=np.array(list(self.vocabulary.keys())),
+            columns=np.fromiter(self.vocabulary.values(), dtype=np.int64, count=len(self.vocabulary)),
+            idf=self.idf,
+            coef=self.coef,
+            intercept=np.array([self.intercept]),
+            classes=self.classes,
+            token_pattern=np.array([self.token_pattern]),
+            lowercase=np.array([self.lowercase]),
+        )
+
+    def vectorize(self, texts):
+        """Return (n_docs, documents, columns) for every in-vocabulary token occurrence."""
+        docs = []
+        tokens = []
+        for doc, text in enumerate(texts):
+            if self.lowercase:
+                text = text.lower()
+            found = self._token_re.findall(text)
+            tokens.extend(found)
+            docs.extend([doc] * len(found))
+
+        if isinstance(self.vocabulary, dict):
+            columns = np.fromiter((self.vocabulary.get(token, -1) for token in tokens),
+                                  dtype=np.int64, count=len(tokens))
+        else:
+            # Table-backed vocabularies (see artifact.HashedVocabulary) look up a whole batch at once
+            columns = self.vocabulary.lookup(tokens)
+
+        known = columns >= 0
+        return len(texts), np.array(docs, dtype=np.int64)[known], columns[known]
+
+    def decision_function(self, texts):
+        return self.decision_function_features(self.vectorize(texts))
+
+    def decision_function_features(self, features):
+        n_docs, docs, columns = features
+        if len(columns) == 0:
+            return np.full(n_docs, self.intercept)
+
+        # Term counts per (document, column) pair
+        keys, counts = np.unique(docs * len(self.idf) + columns, return_counts=True)
+        docs = keys // len(self.idf)
+        columns = keys % len(self.idf)
+
+        weights = counts * self.idf[columns]
+        norms = np.sqrt(np.bincount(docs, weights * weights, minlength=n_docs))
+        dots = np.bincount(docs, weights * self.coef[columns], minlength=n_docs)
+
+        scores = np.zeros(n_docs)
+        np.divide(dots, norms, out=scores, where=norms > 0)
+        return scores + self.intercept
+
+    def predict(self, texts):
+        return self.predict_features(self.vectorize(texts))
+
+    def predict_features(self, features):
+        return self.classes[(self.decision_function_features(features) > 0).astype(np.int64)]
+
+
+def count_mismatches(pipeline, scorer, texts):
+    """Number of texts where the scorer and the original pipeline disagree."""
+    return int(np.sum(pipeline.predict(texts) != scorer.predict(texts)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a joblib TF-IDF pipeline to a compact NumPy scorer.")
+    parser.add_argument("model", help="path to the joblib pipeline, e.g. logistic_regression_sentiment_model.pkl")
+    parser.add_argument("output", help="path of the .npz scorer to write")
+    parser.add_argument("--check", help="text file with one held-out example per line to compare predictions on")
+    args = parser.parse_args(argv)
+
+    import joblib
+
+    pipeline = joblib.load(args.model)
+    scorer = LinearTextScorer.from_pipeline(pipeline)
+    scorer.save(args.output)
+    print(f"Exported {len(scorer.vocabulary)} tokens to {args.output}")
+
+    if args.check:
+        with open(args.check, encoding="utf-8") as f:
+            texts = [line.rstrip("\n") for line in f]
+        mismatches = count_mismatches(pipeline, scorer, texts)
+        print(f"Checked {len(texts)} texts: {mismatches} mismatches")
+        if mismatches:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
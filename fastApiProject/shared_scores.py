@@ -0,0 +1,207 @@
+import fcntl
+import os
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from score_store import ScoreStore
+
+# Columns of the shared table
+VERSION, USED, VENDOR_ID, POSITIVE, TOTAL = range(5)
+COLUMNS = 5
+
+# Multiplicative hashing constant (2**64 / golden ratio) for spreading vendor ids over slots
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+class SharedTableFull(RuntimeError):
+    """Raised when every slot of the shared vendor table is taken."""
+
+
+class SharedMemoryScoreStore(ScoreStore):
+    """Vendor counters in a host-wide shared-memory table that every worker maps.
+
+    The table is an open-addressing hash table of int64 rows (version, used, vendor_id,
+    positive, total). Increments take one of ``stripes`` byte-range locks on a lock file,
+    so workers only contend when they touch the same stripe. Each row carries a
+    seqlock-style version that is odd while a write is in progress, so readers copy the
+    whole table at memory speed and only re-read rows that changed under them.
+
+    ``top`` ranks a snapshot of the whole table, so the ranking is kept for
+    ``ranking_ttl`` seconds and every page and ``min_total`` is cut from it.
+
+    The segment outlives the workers (it is not persisted to disk); ``unlink`` removes it.
+    """
+
+    def __init__(self, name="vendor_scores", capacity=1 << 20, stripes=64, lock_path=None,
+                 ranking_ttl=1.0, clock=time.monotonic):
+        super().__init__()
+        if capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        self.name = name
+        self.capacity = capacity
+        self.stripes = stripes
+        self.lock_path = lock_path or os.path.join("/tmp", f"{name}.lock")
+        # Top bits of the 64-bit multiplicative hash become the slot number
+        self._shift = 64 - (capacity.bit_length() - 1)
+
+        self._shm = None
+        self._table = None
+        self._lock_fd = None
+        # fcntl locks are per process, so threads of one worker also need a local lock
+        self._thread_lock = threading.Lock()
+        # vendor_id -> slot, filled lazily; slots never move once claimed
+        self._slots = {}
+        self.ranking_ttl = ranking_ttl
+        self.clock = clock
+        # (expires_at, vendor_ids, total, ratio) of every reviewed vendor, best first
+        self._ranking = None
+        self._ranking_lock = threading.Lock()
+
+    def start(self):
+        self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = self.capacity * COLUMNS * 8
+
+        # Byte 0 of the lock file guards creating the segment and claiming new slots
+        with self._locked(0):
+            try:
+                self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=self.name)
+                if self._shm.size < size:
+                    raise ValueError(f"Shared segment {self.name!r} is smaller than capacity {self.capacity}")
+        # Python < 3.13 unlinks tracked segments when any attached process exits; the
+        # table must outlive individual workers, so stop tracking it
+        try:
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+        except Exception:
+            pass
+
+        self._table = np.ndarray((self.capacity, COLUMNS), dtype=np.int64, buffer=self._shm.buf)
+
+    def close(self):
+        self._table = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def unlink(self):
+        """Remove the shared segment; workers that still have it mapped keep their view."""
+        shared_memory.SharedMemory(name=self.name).unlink()
+
+    @contextmanager
+    def _locked(self, byte):
+        with self._thread_lock:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, byte)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, byte)
+
+    def _probe(self, vendor_id):
+        """First slot holding vendor_id, or the empty slot where it would be inserted."""
+        table = self._table
+        slot = ((vendor_id * _GOLDEN) & _MASK64) >> self._shift & (self.capacity - 1)
+        for _ in range(self.capacity):
+            if not table[slot, USED] or table[slot, VENDOR_ID] == vendor_id:
+                return slot
+            slot = (slot + 1) & (self.capacity - 1)
+        raise SharedTableFull(f"Shared vendor table {self.name!r} is full ({self.capacity} slots)")
+
+    def _slot(self, vendor_id):
+        slot = self._slots.get(vendor_id)
+        if slot is not None:
+            return slot
+
+        slot = self._probe(vendor_id)
+        if not self._table[slot, USED]:
+            # Claim under the insert lock; another worker may have taken the slot meanwhile
+            with self._locked(0):
+                slot = self._probe(vendor_id)
+                if not self._table[slot, USED]:
+                    self._table[slot, VENDOR_ID] = vendor_id
+                    self._table[slot, USED] = 1
+        self._slots[vendor_id] = slot
+        return slot
+
+    def increment(self, vendor_id, positive, total=1):
+        slot = self._slot(vendor_id)
+        row = self._table[slot]
+        with self._locked(1 + slot % self.stripes):
+            row[VERSION] += 1
+            row[POSITIVE] += positive
+            row[TOTAL] += total
+            row[VERSION] += 1
+            return {"positive": int(row[POSITIVE]), "total": int(row[TOTAL])}
+
+    def get(self, vendor_id):
+        slot = self._probe(vendor_id)
+        if not self._table[slot, USED]:
+            return None
+        positive, total = self._read_rows(np.array([slot]))[0, [POSITIVE, TOTAL]]
+        return {"positive": int(positive), "total": int(total)}
+
+    def _read_rows(self, rows=None):
+        """Consistent copy of the given rows (all rows by default)."""
+        table = self._table if rows is None else self._table[rows]
+        before = table[:, VERSION].copy()
+        snapshot = table.copy()
+        after = (self._table if rows is None else self._table[rows])[:, VERSION]
+        torn = np.flatnonzero((before != after) | ((before & 1) == 1))
+        while len(torn):
+            # Rows written while we copied them: read them again until they are stable
+            source = torn if rows is None else rows[torn]
+            before = self._table[source, VERSION].copy()
+            snapshot[torn] = self._table[source]
+            after = self._table[source, VERSION]
+            torn = torn[(before != after) | ((before & 1) == 1)]
+        return snapshot
+
+    def snapshot(self):
+        """(vendor_ids, positive, total) arrays for every vendor in the table."""
+        snapshot = self._read_rows()
+        used = snapshot[snapshot[:, USED] == 1]
+        return used[:, VENDOR_ID], used[:, POSITIVE], used[:, TOTAL]
+
+    def items(self):
+        vendor_ids, positive, total = self.snapshot()
+        return [
+            (int(vendor_id), {"positive": int(p), "total": int(t)})
+            for vendor_id, p, t in zip(vendor_ids, positive, total)
+        ]
+
+    def ranked(self):
+        """(vendor_ids, total, ratio) arrays of every reviewed vendor, ranked like VendorRanking.
+
+        Recomputed from a table snapshot at most once per ``ranking_ttl`` seconds; concurrent
+        callers wait for the one recompute instead of each copying the table.
+        """
+        with self._ranking_lock:
+            now = self.clock()
+            if self._ranking is None or self._ranking[0] <= now:
+                vendor_ids, positive, total = self.snapshot()
+                keep = total > 0
+                vendor_ids, positive, total = vendor_ids[keep], positive[keep], total[keep]
+                ratio = positive / total
+                order = np.lexsort((vendor_ids, -total, -ratio))
+                self._ranking = (now + self.ranking_ttl, vendor_ids[order], total[order], ratio[order])
+            return self._ranking[1:]
+
+    def top(self, limit=10, offset=0, min_total=1):
+        """Best (vendor_id, ratio) pairs across all workers, from the cached ranking."""
+        vendor_ids, total, ratio = self.ranked()
+        if min_total > 1:
+            rows = np.flatnonzero(total >= min_total)[offset:offset + limit]
+        else:
+            rows = np.arange(offset, min(offset + limit, len(vendor_ids)))
+        return [(int(vendor_id), float(r)) for vendor_id, r in zip(vendor_ids[rows], ratio[rows])]
+
+    def __len__(self):
+        return int(np.count_nonzero(self._table[:, USED]))
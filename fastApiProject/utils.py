@@ -1,16 +1,104 @@
 import joblib
+import os
 import re
+import threading
 
-# Load the pre-trained model
-model = joblib.load('logistic_regression_sentiment_model.pkl')
+from artifact import load_artifact
+from cache import PredictionCache
+from metrics import metrics
+from scorer import LinearTextScorer, UnsupportedModel
+
+ARTIFACT_PATH = os.getenv("SENTIMENT_ARTIFACT_PATH", "sentiment_model")
+SCORER_PATH = os.getenv("SENTIMENT_SCORER_PATH", "sentiment_scorer.npz")
+MODEL_PATH = os.getenv("SENTIMENT_MODEL_PATH", "logistic_regression_sentiment_model.pkl")
+
+
+def load_model():
+    # Prefer the memory-mapped artifact (python artifact.py build <model.pkl> <dir>), which
+    # every worker shares through the page cache, then the exported NumPy scorer
+    if os.path.isdir(ARTIFACT_PATH):
+        return load_artifact(ARTIFACT_PATH)
+    if os.path.exists(SCORER_PATH):
+        return LinearTextScorer.load(SCORER_PATH)
+
+    pipeline = joblib.load(MODEL_PATH)
+    try:
+        return LinearTextScorer.from_pipeline(pipeline)
+    except UnsupportedModel:
+        return pipeline
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    # The model is loaded on the first prediction (or by warmup), not at import time
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_model()
+    return _model
+
+
+def warmup():
+    get_model()
+
+# Repeated feedback ("good", "nice product", bot spam) is answered without re-running the model
+prediction_cache = PredictionCache(
+    max_entries=int(os.getenv("PREDICTION_CACHE_SIZE", "100000")),
+    max_bytes=int(os.getenv("PREDICTION_CACHE_MAX_MB", "64")) * 1024 * 1024,
+    ttl=float(os.getenv("PREDICTION_CACHE_TTL", "3600")),
+)
+
+_NON_WORD_RE = re.compile(r'\W')
+# URLs are dropped first, as their own pass: a mention must not swallow the start of a URL
+_URL_RE = re.compile(r'http\S+|www\S+|https\S+')
+# Then @mentions are dropped and any other non-word character becomes a space
+_NORMALIZE_RE = re.compile(r'@\w+|(\W)')
+
+
+def _replace_match(match):
+    return ' ' if match.group(1) else ''
 
 def clean_text(text):
-    text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
-    text = re.sub(r'@\w+', '', text)
-    text = re.sub(r'\W', ' ', text)
-    return text.lower()
+    # Most feedback has no URL or mention, so a single non-word pass is enough
+    if '@' not in text and 'http' not in text and 'www' not in text:
+        return _NON_WORD_RE.sub(' ', text).lower()
+    return _NORMALIZE_RE.sub(_replace_match, _URL_RE.sub('', text)).lower()
+
+def _predict(model, texts):
+    # Vectorization and the linear model are timed separately for /metrics
+    if isinstance(model, LinearTextScorer):
+        with metrics.timer("vectorize"):
+            features = model.vectorize(texts)
+        with metrics.timer("predict"):
+            return model.predict_features(features)
+
+    with metrics.timer("vectorize"):
+        features = model[:-1].transform(texts)
+    with metrics.timer("predict"):
+        return model[-1].predict(features)
+
+def predict_sentiments(texts):
+    with metrics.timer("clean"):
+        cleaned_texts = [clean_text(text) for text in texts]
+    with metrics.timer("cache_lookup"):
+        results = [prediction_cache.get(cleaned) for cleaned in cleaned_texts]
+
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        # One vectorized predict call for the unique texts not seen before
+        unseen = dict.fromkeys(cleaned_texts[i] for i in misses)
+        predictions = _predict(get_model(), list(unseen))
+        for cleaned, prediction in zip(list(unseen), predictions):
+            sentiment = "Good" if prediction == 1 else "Poor"
+            prediction_cache.put(cleaned, sentiment)
+            unseen[cleaned] = sentiment
+        for i in misses:
+            results[i] = unseen[cleaned_texts[i]]
+    return results
 
 def predict_sentiment(text):
-    cleaned_text = clean_text(text)
-    prediction = model.predict([cleaned_text])[0]
-    return "Good" if prediction == 1 else "Poor"
\ No newline at end of file
+    return predict_sentiments([text])[0]
\ No newline at end of file
@@ -0,0 +1,191 @@
+import threading
+import time
+
+import numpy as np
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+class RingCounter:
+    """Positive/total counts of every vendor in a fixed ring of time buckets.
+
+    Counts are stored column-wise: one uint32 row per bucket with a column per vendor
+    slot, so a window over all vendors is the sum of a few contiguous rows. ``head`` is
+    the newest bucket for all vendors; advancing it clears the rows that leave the ring.
+    """
+
+    def __init__(self, size, capacity):
+        self.size = size
+        self.head = None
+        self.positive = np.zeros((size, capacity), dtype=np.uint32)
+        self.total = np.zeros((size, capacity), dtype=np.uint32)
+
+    def grow(self, capacity):
+        for name in ("positive", "total"):
+            old = getattr(self, name)
+            grown = np.zeros((self.size, capacity), dtype=np.uint32)
+            grown[:, :old.shape[1]] = old
+            setattr(self, name, grown)
+
+    def advance(self, bucket):
+        if self.head is not None and bucket <= self.head:
+            return
+        if self.head is None or bucket - self.head >= self.size:
+            self.positive[:] = 0
+            self.total[:] = 0
+        else:
+            for b in range(self.head + 1, bucket + 1):
+                self.positive[b % self.size] = 0
+                self.total[b % self.size] = 0
+        self.head = bucket
+
+    def add(self, slot, bucket, positive, total):
+        self.advance(bucket)
+        if self.head - bucket >= self.size:
+            # Older than the ring reaches back; nothing to count it in
+            return
+        self.positive[bucket % self.size, slot] += positive
+        self.total[bucket % self.size, slot] += total
+
+    def counts(self, bucket, buckets, columns):
+        """(positive, total) over the ``buckets`` most recent buckets ending at ``bucket``.
+
+        Sums the given slice of vendor columns. Read-only: buckets past ``head`` are empty
+        and ones that left the ring are skipped, so readers never advance the ring.
+        """
+        positive = np.zeros(self.total[0, columns].shape[0], dtype=np.int64)
+        total = np.zeros_like(positive)
+        if self.head is None:
+            return positive, total
+        for b in range(max(bucket - buckets + 1, self.head - self.size + 1), min(bucket, self.head) + 1):
+            positive += self.positive[b % self.size, columns]
+            total += self.total[b % self.size, columns]
+        return positive, total
+
+
+class WindowedScores:
+    """Time-windowed vendor sentiment counters with bounded memory per vendor.
+
+    Every vendor gets a slot in column-wise NumPy arrays: an hourly and a daily ring
+    (``hourly_buckets`` + ``daily_buckets`` buckets) plus an exponentially decayed score,
+    about 0.5 KB whatever its review volume. Windows shift without any update, so a
+    windowed ranking is recomputed in one vectorized pass over all vendors and reused
+    for ``ranking_ttl`` seconds; ``min_total`` only filters the cached ranking.
+    """
+
+    def __init__(self, hourly_buckets=24, daily_buckets=30, half_life_hours=72.0,
+                 ranking_ttl=30.0, clock=time.time, capacity=1024):
+        self.hourly_buckets = hourly_buckets
+        self.daily_buckets = daily_buckets
+        self.half_life = half_life_hours * HOUR
+        self.ranking_ttl = ranking_ttl
+        self.clock = clock
+
+        # vendor_id -> slot; slots are handed out in order and never move
+        self._slots = {}
+        self._vendor_ids = np.zeros(capacity, dtype=np.int64)
+        self.hourly = RingCounter(hourly_buckets, capacity)
+        self.daily = RingCounter(daily_buckets, capacity)
+        # Decayed positive/total per slot, as of decay_updated
+        self.decay_positive = np.zeros(capacity)
+        self.decay_total = np.zeros(capacity)
+        self.decay_updated = np.zeros(capacity)
+        # Rankings run on another thread than record; this guards slots and array growth
+        self._lock = threading.Lock()
+        # window -> (expires_at, vendor_ids, total, ratio), best first
+        self._rankings = {}
+        self._ranking_lock = threading.Lock()
+
+        # window name -> (ring attribute, bucket width, buckets)
+        self.windows = {}
+        for hours in (1, 6, 24):
+            if hours <= hourly_buckets:
+                self.windows[f"{hours}h"] = ("hourly", HOUR, hours)
+        for days in (7, 30):
+            if days <= daily_buckets:
+                self.windows[f"{days}d"] = ("daily", DAY, days)
+
+    def _slot(self, vendor_id, now):
+        slot = self._slots.get(vendor_id)
+        if slot is None:
+            slot = len(self._slots)
+            if slot == len(self._vendor_ids):
+                self._grow(2 * slot)
+            self._vendor_ids[slot] = vendor_id
+            self.decay_updated[slot] = now
+            self._slots[vendor_id] = slot
+        return slot
+
+    def _grow(self, capacity):
+        self.hourly.grow(capacity)
+        self.daily.grow(capacity)
+        for name in ("_vendor_ids", "decay_positive", "decay_total", "decay_updated"):
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def record(self, vendor_id, positive, total=1, now=None):
+        now = self.clock() if now is None else now
+        with self._lock:
+            slot = self._slot(vendor_id, now)
+            self.hourly.add(slot, int(now // HOUR), positive, total)
+            self.daily.add(slot, int(now // DAY), positive, total)
+            updated = self.decay_updated[slot]
+            factor = 0.5 ** ((now - updated) / self.half_life) if now > updated else 1.0
+            self.decay_positive[slot] = self.decay_positive[slot] * factor + positive
+            self.decay_total[slot] = self.decay_total[slot] * factor + total
+            self.decay_updated[slot] = max(now, updated)
+
+    def _counts(self, window, now, columns):
+        """(positive, total) arrays over a window name or "decay" for a slice of slots."""
+        if window == "decay":
+            factor = 0.5 ** (np.maximum(now - self.decay_updated[columns], 0.0) / self.half_life)
+            return self.decay_positive[columns] * factor, self.decay_total[columns] * factor
+        ring, width, buckets = self.windows[window]
+        return getattr(self, ring).counts(int(now // width), buckets, columns)
+
+    def counts(self, vendor_id, window, now=None):
+        """(positive, total) for one vendor over a window name or "decay"."""
+        now = self.clock() if now is None else now
+        slot = self._slots.get(vendor_id)
+        if slot is None:
+            return 0, 0
+        positive, total = self._counts(window, now, slice(slot, slot + 1))
+        return positive[0].item(), total[0].item()
+
+    def ranked(self, window):
+        """(vendor_ids, total, ratio) arrays of every vendor reviewed in the window, best first.
+
+        Raises KeyError for unknown windows. Recomputed at most once per ``ranking_ttl``
+        seconds; concurrent callers wait for the one recompute.
+        """
+        if window != "decay" and window not in self.windows:
+            raise KeyError(window)
+
+        with self._ranking_lock:
+            now = self.clock()
+            cached = self._rankings.get(window)
+            if cached is None or cached[0] < now:
+                with self._lock:
+                    count = len(self._slots)
+                    vendor_ids = self._vendor_ids[:count].copy()
+                positive, total = self._counts(window, now, slice(0, count))
+                keep = total > 0
+                vendor_ids, positive, total = vendor_ids[keep], positive[keep], total[keep]
+                ratio = positive / total
+                # Same order as VendorRanking: ratio, then review count, then vendor id
+                order = np.lexsort((vendor_ids, -total, -ratio))
+                cached = (now + self.ranking_ttl, vendor_ids[order], total[order], ratio[order])
+                self._rankings[window] = cached
+            return cached[1:]
+
+    def top(self, window, limit=10, offset=0, min_total=1):
+        """Best (vendor_id, ratio) pairs over a window; raises KeyError for unknown windows."""
+        vendor_ids, total, ratio = self.ranked(window)
+        rows = np.flatnonzero(total >= min_total)[offset:offset + limit]
+        return [(int(vendor_id), float(r)) for vendor_id, r in zip(vendor_ids[rows], ratio[rows])]
+
+    def __len__(self):
+        return len(self._slots)
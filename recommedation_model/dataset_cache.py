@@ -0,0 +1,112 @@
+import argparse
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+
+from preprocessing import CLEANING_VERSION, clean_texts
+
+DATASET_NAME = "adilbekovich/Sentiment140Twitter"
+DEFAULT_DIRECTORY = ".dataset_cache"
+
+# Only what training and evaluation read: cleaned text and the binary label (1 = positive)
+SCHEMA = pa.schema([("cleaned", pa.large_string()), ("label", pa.int8())])
+
+
+def snapshot_path(split, directory=DEFAULT_DIRECTORY):
+    # The cleaning version is part of the name, so changing clean_text never reuses stale text
+    return os.path.join(directory, f"{split}-clean{CLEANING_VERSION}.arrow")
+
+
+def build_snapshot(split, directory=DEFAULT_DIRECTORY, workers=None, batch_size=200_000):
+    """Clean one split once and write it as an Arrow IPC file; returns the file path.
+
+    Needs the hub (or its local cache) only here. The content hash sidecar is written
+    last and marks the snapshot as complete, so an interrupted build is redone.
+    """
+    from datasets import load_dataset
+
+    os.makedirs(directory, exist_ok=True)
+    path = snapshot_path(split, directory)
+    tmp = path + ".tmp"
+    if os.path.exists(path + ".sha256"):
+        os.remove(path + ".sha256")
+    dataset = load_dataset(DATASET_NAME, split=split).with_format("arrow")
+
+    digest = hashlib.sha256()
+    rows = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool, pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, SCHEMA) as writer:
+            for batch in dataset.iter(batch_size=batch_size):
+                cleaned = clean_texts(batch.column("text").to_pylist(), chunk_size=10_000, pool=pool)
+                labels = (batch.column("label").to_numpy() == 1).astype(np.int8)
+                for text in cleaned:
+                    digest.update(text.encode("utf-8"))
+                    digest.update(b"\0")
+                digest.update(labels.tobytes())
+                writer.write_batch(pa.record_batch(
+                    [pa.array(cleaned, type=pa.large_string()), pa.array(labels)], schema=SCHEMA,
+                ))
+                rows += len(labels)
+
+    os.replace(tmp, path)
+    with open(tmp, "w") as f:
+        f.write(f"{digest.hexdigest()[:24]} {rows}\n")
+    os.replace(tmp, path + ".sha256")
+    return path
+
+
+def open_snapshot(path):
+    """Arrow table whose columns are views over the memory-mapped file (nothing is copied)."""
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def open_split(split, directory=DEFAULT_DIRECTORY, workers=None, refresh=False):
+    """The memory-mapped snapshot of a split, built first if it does not exist yet."""
+    path = snapshot_path(split, directory)
+    if refresh or not os.path.exists(path + ".sha256"):
+        build_snapshot(split, directory, workers=workers)
+    return open_snapshot(path)
+
+
+def snapshot_hash(split, directory=DEFAULT_DIRECTORY):
+    """Content hash of a built snapshot, for keying caches derived from it."""
+    with open(snapshot_path(split, directory) + ".sha256") as f:
+        return f.read().split()[0]
+
+
+def columns(table):
+    """(cleaned texts, labels) of a table or slice; the labels stay a view when possible."""
+    labels = table.column("label")
+    labels = labels.chunk(0) if labels.num_chunks == 1 else labels.combine_chunks()
+    return table.column("cleaned").to_pylist(), labels.to_numpy(zero_copy_only=False)
+
+
+def iter_batches(table, batch_size):
+    """(cleaned texts, labels) chunks of at most batch_size rows.
+
+    Slicing a memory-mapped table is zero-copy; only the texts of the current chunk are
+    turned into Python strings, which is what the sklearn vectorizers consume.
+    """
+    for start in range(0, table.num_rows, batch_size):
+        yield columns(table.slice(start, batch_size))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot Sentiment140 splits into local Arrow files.")
+    parser.add_argument("--splits", nargs="+", default=["train", "test"])
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY)
+    parser.add_argument("--workers", type=int, default=None, help="processes used for text cleaning")
+    parser.add_argument("--refresh", action="store_true", help="rebuild snapshots that already exist")
+    args = parser.parse_args(argv)
+
+    for split in args.splits:
+        table = open_split(split, args.directory, workers=args.workers, refresh=args.refresh)
+        print(f"{split}: {table.num_rows} rows in {snapshot_path(split, args.directory)} "
+              f"({snapshot_hash(split, args.directory)})")
+
+
+if __name__ == "__main__":
+    main()
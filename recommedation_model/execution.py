@@ -1,64 +1,155 @@
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import joblib
-from datasets import load_dataset
-from sklearn.feature_extraction.text import TfidfVectorizer
-import re
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-
-# Load the pre-trained Logistic Regression model
-model = joblib.load('logistic_regression_sentiment_model.pkl')
-
-# Load the dataset for testing
-dataset = load_dataset("adilbekovich/Sentiment140Twitter", split="test")
-df = dataset.to_pandas()
-
-# Clean text function (same as before)
-def clean_text(text):
-    text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
-    text = re.sub(r'@\w+', '', text)
-    text = re.sub(r'\W', ' ', text)
-    return text.lower()
-
-# Apply cleaning to the test data
-df['cleaned_text'] = df['text'].apply(clean_text)
-
-# Test data
-X_test = df['cleaned_text']
-y_test = df['label'].apply(lambda x: 1 if x == 1 else 0)  # Map sentiment to binary classes (1 = positive, 0 = negative)
-
-# Make predictions on the test data
-y_pred = model.predict(X_test)
-
-# Calculate and print the accuracy, confusion matrix, and classification report
-accuracy = accuracy_score(y_test, y_pred)
-conf_matrix = confusion_matrix(y_test, y_pred)
-class_report = classification_report(y_test, y_pred)
-
-# Output results
-print("Accuracy: {:.4f}".format(accuracy))
-print("Confusion Matrix:")
-print(conf_matrix)
-print("Classification Report:")
-print(class_report)
-
-# Testing the best model with user input
-print("\nEnter text to analyze sentiment (type 'exit' to quit):")
-while True:
-    text_input = input("Text: ")
-    if text_input.lower() == "exit":
-        print("Exiting...")
-        break
-
-    # Clean the input text using the defined clean_text function
-    cleaned_input = clean_text(text_input)
-
-    # Make a prediction with the best model
-    prediction = model.predict([cleaned_input])
-
-    # Map prediction to sentiment label
-    sentiment_label = "Good" if prediction[0] == 1 else "Poor"
-    #print(f"The sentiment is: {sentiment_label}")
-
-    if sentiment_label == "Good":
-        print("Sentiment: 1")
-    else:
-        print("Sentiment: 0")
\ No newline at end of file
+import numpy as np
+
+from dataset_cache import DEFAULT_DIRECTORY, columns, open_snapshot, open_split, snapshot_path
+from preprocessing import clean_text
+
+# Models and the memory-mapped split, opened once per worker process by _init_worker
+_MODELS = {}
+_TABLE = None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate one or more sentiment models on Sentiment140.")
+    parser.add_argument("models", nargs="*", default=["logistic_regression_sentiment_model.pkl"],
+                        help="model files saved by feedbaack_classify.py")
+    parser.add_argument("--split", default="test")
+    parser.add_argument("--dataset-dir", default=DEFAULT_DIRECTORY, help="local Arrow snapshots of the dataset")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="rows per scoring task")
+    parser.add_argument("--workers", type=int, default=None, help="scoring processes (1 = score in this process)")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many rows")
+    parser.add_argument("--report", help="write the comparison as JSON to this file")
+    parser.add_argument("--interactive", action="store_true", help="prompt for texts to classify with the first model")
+    return parser.parse_args(argv)
+
+
+def _init_worker(paths, snapshot):
+    global _TABLE
+    for path in paths:
+        _MODELS[path] = joblib.load(path)
+    # Every worker maps the same file, so chunks are sent as row ranges instead of texts
+    _TABLE = open_snapshot(snapshot)
+
+
+def _score_chunk(offset, length):
+    """Confusion counts and prediction time of every loaded model on one range of rows."""
+    cleaned, labels = columns(_TABLE.slice(offset, length))
+    labels = labels.astype(np.int64)
+    results = {}
+    for path, model in _MODELS.items():
+        start = time.perf_counter()
+        predictions = np.asarray(model.predict(cleaned), dtype=np.int64)
+        seconds = time.perf_counter() - start
+        # Row = true label, column = prediction, like sklearn's confusion_matrix
+        confusion = np.bincount(2 * labels + predictions, minlength=4).reshape(2, 2)
+        results[path] = (confusion, seconds)
+    return results
+
+
+def _scored_chunks(snapshot, rows, models, chunk_size, workers):
+    ranges = [(start, min(chunk_size, rows - start)) for start in range(0, rows, chunk_size)]
+    if workers == 1:
+        _init_worker(models, snapshot)
+        for start, length in ranges:
+            yield _score_chunk(start, length)
+        return
+
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(models, snapshot)) as pool:
+        # Keep a few chunks in flight per worker so results are consumed as they finish
+        pending = deque()
+        for start, length in ranges:
+            pending.append(pool.submit(_score_chunk, start, length))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def evaluate(models, split="test", chunk_size=10_000, workers=None, limit=None, dataset_dir=DEFAULT_DIRECTORY):
+    """Score every model on the same chunks of the split and return the comparison report."""
+    rows = open_split(split, dataset_dir, workers=workers).num_rows
+    if limit is not None:
+        rows = min(rows, limit)
+    confusion = {path: np.zeros((2, 2), dtype=np.int64) for path in models}
+    predict_seconds = dict.fromkeys(models, 0.0)
+
+    start = time.perf_counter()
+    for results in _scored_chunks(snapshot_path(split, dataset_dir), rows, models, chunk_size, workers):
+        for path, (chunk_confusion, seconds) in results.items():
+            confusion[path] += chunk_confusion
+            predict_seconds[path] += seconds
+    wall_seconds = time.perf_counter() - start
+
+    report = {"split": split, "rows": rows, "wall_seconds": wall_seconds, "rows_per_sec": rows / wall_seconds,
+              "models": {}}
+    for path in models:
+        matrix = confusion[path]
+        # rows_per_sec is single-core predict throughput, comparable between models
+        report["models"][path] = {
+            "accuracy": float(matrix.trace() / rows) if rows else None,
+            "confusion_matrix": matrix.tolist(),
+            "predict_seconds": predict_seconds[path],
+            "rows_per_sec": rows / predict_seconds[path] if predict_seconds[path] else None,
+            "size_bytes": os.path.getsize(path),
+        }
+    return report
+
+
+def print_report(report):
+    print(f"{report['rows']} rows of the {report['split']} split in {report['wall_seconds']:.2f}s "
+          f"({report['rows_per_sec']:.0f} rows/sec end to end)")
+    print(f"{'model':<45} {'accuracy':>9} {'rows/sec':>12}  confusion matrix")
+    for path, result in report["models"].items():
+        accuracy = "n/a" if result["accuracy"] is None else f"{result['accuracy']:.4f}"
+        rate = "n/a" if result["rows_per_sec"] is None else f"{result['rows_per_sec']:.0f}"
+        print(f"{path:<45} {accuracy:>9} {rate:>12}  {result['confusion_matrix']}")
+
+
+def interactive_loop(model):
+    # Testing the best model with user input
+    print("\nEnter text to analyze sentiment (type 'exit' to quit):")
+    while True:
+        text_input = input("Text: ")
+        if text_input.lower() == "exit":
+            print("Exiting...")
+            break
+
+        # Clean the input text using the defined clean_text function
+        cleaned_input = clean_text(text_input)
+
+        # Make a prediction with the best model
+        prediction = model.predict([cleaned_input])
+
+        # Map prediction to sentiment label
+        sentiment_label = "Good" if prediction[0] == 1 else "Poor"
+        #print(f"The sentiment is: {sentiment_label}")
+
+        if sentiment_label == "Good":
+            print("Sentiment: 1")
+        else:
+            print("Sentiment: 0")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = evaluate(args.models, split=args.split, chunk_size=args.chunk_size, workers=args.workers,
+                      limit=args.limit, dataset_dir=args.dataset_dir)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.interactive:
+        interactive_loop(joblib.load(args.models[0]))
+
+
+if __name__ == "__main__":
+    main()
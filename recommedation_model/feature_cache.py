@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+import scipy.sparse
+
+
+def content_hash(*parts):
+    """sha256 over texts/labels/settings; any change in content gives a new cache key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(np.ascontiguousarray(part).tobytes())
+        elif isinstance(part, (list, tuple)) and part and isinstance(part[0], str):
+            for text in part:
+                digest.update(text.encode("utf-8"))
+                digest.update(b"\0")
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\1")
+    return digest.hexdigest()[:24]
+
+
+class FeatureCache:
+    """On-disk cache of fitted TF-IDF features, keyed by content hash."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def load_features(self, key):
+        """Return (vectorizer, X_train, X_test, y_train, y_test) or None on a miss."""
+        directory = self._path(f"features-{key}")
+        if not os.path.exists(os.path.join(directory, "complete")):
+            return None
+        return (
+            joblib.load(os.path.join(directory, "vectorizer.joblib")),
+            scipy.sparse.load_npz(os.path.join(directory, "X_train.npz")),
+            scipy.sparse.load_npz(os.path.join(directory, "X_test.npz")),
+            np.load(os.path.join(directory, "y_train.npy")),
+            np.load(os.path.join(directory, "y_test.npy")),
+        )
+
+    def save_features(self, key, vectorizer, X_train, X_test, y_train, y_test):
+        directory = self._path(f"features-{key}")
+        os.makedirs(directory, exist_ok=True)
+        joblib.dump(vectorizer, os.path.join(directory, "vectorizer.joblib"))
+        scipy.sparse.save_npz(os.path.join(directory, "X_train.npz"), X_train)
+        scipy.sparse.save_npz(os.path.join(directory, "X_test.npz"), X_test)
+        np.save(os.path.join(directory, "y_train.npy"), np.asarray(y_train))
+        np.save(os.path.join(directory, "y_test.npy"), np.asarray(y_test))
+        # Written last, so an interrupted save is never mistaken for a cache hit
+        open(os.path.join(directory, "complete"), "w").close()
@@ -1,69 +1,202 @@
-from datasets import load_dataset
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
 from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.pipeline import make_pipeline
 from sklearn.metrics import classification_report, accuracy_score, confusion_matrix
-import re
 import joblib
 
-dataset = load_dataset("adilbekovich/Sentiment140Twitter", split="train")
-df = dataset.to_pandas()
-
-
-def clean_text(text):
-    text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
-    text = re.sub(r'@\w+', '', text)
-    text = re.sub(r'\W', ' ', text)
-    return text.lower()
-
-# Map sentiment to binary classes
-def map_sentiment(score):
-    return 1 if score == 1 else 0
-
-df['cleaned_text'] = df['text'].apply(clean_text)
-df['sentiment_binary'] = df['label'].apply(map_sentiment)
-
-X = df['cleaned_text']
-y = df['sentiment_binary']
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-#logistic regression classifier
-model = make_pipeline(TfidfVectorizer(), LogisticRegression(max_iter=1000))
-
-model.fit(X_train, y_train)
-
-y_pred = model.predict(X_test)
-
-
-accuracy = accuracy_score(y_test, y_pred)
-confusion = confusion_matrix(y_test, y_pred)
-
-
-print("Logistic Regression Results:")
-print(f"Accuracy: {accuracy:.4f}")
-print("Confusion Matrix:")
-print(confusion)
-print(classification_report(y_test, y_pred))
-
-# Save the model
-joblib.dump(model, 'logistic_regression_sentiment_model.pkl')
-
-# Testing the best model with user input
-print("\nEnter text to analyze sentiment (type 'exit' to quit):")
-while True:
-    text_input = input("Text: ")
-    if text_input.lower() == "exit":
-        print("Exiting...")
-        break
-
-    # Clean the input text using the defined clean_text function
-    cleaned_input = clean_text(text_input)
-
-    # Make a prediction with the best model
-    prediction = model.predict([cleaned_input])
-
-    # Map prediction to sentiment label
-    sentiment_label = "Good" if prediction[0] == 1 else "Poor"
-
-    print(f"The sentiment is: {sentiment_label}")
+from dataset_cache import DEFAULT_DIRECTORY, columns, iter_batches, open_split, snapshot_hash
+from feature_cache import FeatureCache, content_hash
+from incremental import TrainingCheckpoint, iter_jsonl_chunks, make_vectorizer, train_incremental
+from preprocessing import clean_text, clean_texts
+
+
+@contextmanager
+def stage(timings, name):
+    """Record the wall time of a training stage under timings[name]."""
+    start = time.perf_counter()
+    yield
+    timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the Sentiment140 logistic regression sentiment model.")
+    parser.add_argument("--output", default="logistic_regression_sentiment_model.pkl", help="where to save the model")
+    parser.add_argument("--mode", choices=["batch", "stream"], default="batch",
+                        help="batch: TF-IDF + LogisticRegression in memory; "
+                             "stream: hashed features + SGD partial_fit over chunks with bounded memory")
+    parser.add_argument("--dataset-dir", default=DEFAULT_DIRECTORY, help="local Arrow snapshots of the dataset")
+    parser.add_argument("--refresh-dataset", action="store_true", help="rebuild the dataset snapshot")
+    parser.add_argument("--cache-dir", default=".feature_cache",
+                        help="cache for TF-IDF features ('' disables caching)")
+    parser.add_argument("--workers", type=int, default=None, help="processes used for text cleaning")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="texts per cleaning task")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--min-df", type=int, default=1, help="TfidfVectorizer min_df")
+    parser.add_argument("--max-features", type=int, default=None, help="TfidfVectorizer max_features")
+    parser.add_argument("--C", type=float, default=1.0, help="LogisticRegression inverse regularization strength")
+    parser.add_argument("--max-iter", type=int, default=1000)
+    parser.add_argument("--timings-json", help="also write the per-stage timings to this file")
+    parser.add_argument("--interactive", action="store_true", help="prompt for texts to classify after training")
+
+    stream = parser.add_argument_group("stream mode")
+    stream.add_argument("--stream-chunk-size", type=int, default=100_000, help="rows per partial_fit chunk")
+    stream.add_argument("--n-features", type=int, default=2 ** 20, help="HashingVectorizer n_features")
+    stream.add_argument("--alpha", type=float, default=1e-6, help="SGDClassifier regularization strength")
+    stream.add_argument("--extra-data", nargs="*", default=[],
+                        help='JSONL files of {"text", "label"} records to train on after Sentiment140')
+    stream.add_argument("--checkpoint", default="stream_training.ckpt", help="checkpoint written after every chunk and removed when training finishes")
+    stream.add_argument("--no-resume", action="store_true", help="ignore an existing checkpoint and start over")
+    return parser.parse_args(argv)
+
+
+def build_features(args, cache, timings):
+    """Split and TF-IDF vectorized train/test data, reused from the cache when possible."""
+    with stage(timings, "load_dataset"):
+        table = open_split("train", args.dataset_dir, workers=args.workers, refresh=args.refresh_dataset)
+
+    vectorizer = TfidfVectorizer(min_df=args.min_df, max_features=args.max_features)
+    # The snapshot's content hash stands in for hashing every text again
+    feature_key = content_hash(snapshot_hash("train", args.dataset_dir), {
+        "test_size": args.test_size,
+        "random_state": args.random_state,
+        "vectorizer": vectorizer.get_params(),
+    })
+
+    if cache is not None:
+        with stage(timings, "load_features"):
+            features = cache.load_features(feature_key)
+        if features is not None:
+            print(f"Using cached features {feature_key}")
+            return features
+
+    with stage(timings, "load_columns"):
+        cleaned, labels = columns(table)
+
+    with stage(timings, "vectorize"):
+        X_train, X_test, y_train, y_test = train_test_split(
+            cleaned, labels, test_size=args.test_size, random_state=args.random_state
+        )
+        X_train = vectorizer.fit_transform(X_train)
+        X_test = vectorizer.transform(X_test)
+
+    if cache is not None:
+        with stage(timings, "save_features"):
+            cache.save_features(feature_key, vectorizer, X_train, X_test, y_train, y_test)
+    return vectorizer, X_train, X_test, y_train, y_test
+
+
+def train_batch(args, cache, timings):
+    vectorizer, X_train, X_test, y_train, y_test = build_features(args, cache, timings)
+
+    #logistic regression classifier
+    classifier = LogisticRegression(C=args.C, max_iter=args.max_iter)
+    with stage(timings, "fit"):
+        classifier.fit(X_train, y_train)
+
+    with stage(timings, "evaluate"):
+        y_pred = classifier.predict(X_test)
+        accuracy = accuracy_score(y_test, y_pred)
+        confusion = confusion_matrix(y_test, y_pred)
+
+    print("Logistic Regression Results:")
+    print(f"Accuracy: {accuracy:.4f}")
+    print("Confusion Matrix:")
+    print(confusion)
+    print(classification_report(y_test, y_pred))
+    return make_pipeline(vectorizer, classifier), accuracy
+
+
+def train_stream(args, timings):
+    """Out-of-core training: memory depends on the chunk size, not on the corpus size."""
+    with stage(timings, "load_dataset"):
+        table = open_split("train", args.dataset_dir, workers=args.workers, refresh=args.refresh_dataset)
+    vectorizer = make_vectorizer(args.n_features)
+    classifier = SGDClassifier(loss="log_loss", alpha=args.alpha)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool, stage(timings, "train_stream"):
+        def chunks():
+            # The snapshot is already cleaned; only the extra JSONL files go through clean_texts
+            yield from iter_batches(table, args.stream_chunk_size)
+            for path in args.extra_data:
+                for texts, labels in iter_jsonl_chunks(path, args.stream_chunk_size):
+                    yield clean_texts(texts, chunk_size=args.chunk_size, pool=pool), labels
+
+        state = train_incremental(
+            chunks(), vectorizer, classifier,
+            checkpoint=TrainingCheckpoint(args.checkpoint),
+            resume=not args.no_resume,
+            # A checkpoint only lines up with the chunks when they are cut from the same data the same way
+            settings={
+                "chunk_size": args.stream_chunk_size,
+                "snapshot": snapshot_hash("train", args.dataset_dir),
+                "extra_data": [os.path.abspath(path) for path in args.extra_data],
+            },
+        )
+
+    confusion = state["confusion"]
+    accuracy = confusion.trace() / confusion.sum() if confusion.sum() else float("nan")
+    print("Streaming SGD Results (progressive validation):")
+    print(f"Accuracy: {accuracy:.4f}")
+    print("Confusion Matrix:")
+    print(confusion)
+    return make_pipeline(vectorizer, state["classifier"]), accuracy
+
+
+def interactive_loop(model):
+    # Testing the best model with user input
+    print("\nEnter text to analyze sentiment (type 'exit' to quit):")
+    while True:
+        text_input = input("Text: ")
+        if text_input.lower() == "exit":
+            print("Exiting...")
+            break
+
+        # Clean the input text using the defined clean_text function
+        cleaned_input = clean_text(text_input)
+
+        # Make a prediction with the best model
+        prediction = model.predict([cleaned_input])
+
+        # Map prediction to sentiment label
+        sentiment_label = "Good" if prediction[0] == 1 else "Poor"
+
+        print(f"The sentiment is: {sentiment_label}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    timings = {}
+    cache = FeatureCache(args.cache_dir) if args.cache_dir else None
+
+    if args.mode == "stream":
+        model, accuracy = train_stream(args, timings)
+    else:
+        model, accuracy = train_batch(args, cache, timings)
+
+    # Saved as a single pipeline so fastApiProject/utils.py can load it as before
+    with stage(timings, "save_model"):
+        joblib.dump(model, args.output)
+
+    print("Timing breakdown:")
+    for name, seconds in timings.items():
+        print(f"  {name:<14} {seconds:8.2f}s")
+    print(f"  {'total':<14} {sum(timings.values()):8.2f}s")
+    if args.timings_json:
+        with open(args.timings_json, "w") as f:
+            json.dump({"mode": args.mode, "accuracy": accuracy, "timings": timings}, f, indent=2)
+
+    if args.interactive:
+        interactive_loop(model)
+
+
+if __name__ == "__main__":
+    main()
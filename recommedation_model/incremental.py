@@ -0,0 +1,110 @@
+import json
+import os
+
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from preprocessing import map_sentiment
+
+CLASSES = np.array([0, 1])
+
+
+def make_vectorizer(n_features=2 ** 20):
+    """Stateless featurizer: nothing to fit, so any chunk can be transformed on its own."""
+    return HashingVectorizer(n_features=n_features, alternate_sign=False, norm="l2")
+
+
+def iter_jsonl_chunks(path, chunk_size):
+    """(texts, labels) chunks from a JSONL file of {"text", "label"} records (label 1 = positive)."""
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            texts.append(record["text"])
+            labels.append(map_sentiment(record["label"]))
+            if len(texts) == chunk_size:
+                yield texts, labels
+                texts, labels = [], []
+    if texts:
+        yield texts, labels
+
+
+class TrainingCheckpoint:
+    """Classifier state plus progress, written atomically after each chunk."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        return joblib.load(self.path) if self.path and os.path.exists(self.path) else None
+
+    def save(self, state):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        joblib.dump(state, tmp)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def train_incremental(chunks, vectorizer, classifier, checkpoint, clean=None, resume=True, settings=None, log=print):
+    """Fit ``classifier`` with partial_fit over (texts, labels) chunks.
+
+    Each chunk is scored before it is trained on (progressive validation), which gives a
+    held-out accuracy without keeping a test set in memory. Progress is checkpointed
+    after every chunk; with ``resume`` a run continues after the last finished chunk.
+    ``clean`` is applied to each chunk's texts unless they are already cleaned.
+
+    ``settings`` describes how the chunks are produced (chunk size, data sources). A
+    checkpoint is only resumed when it was made with the same settings, featurizer and
+    classifier parameters, and it is removed once the run finishes, so the next run
+    starts over. Returns the training state dict.
+    """
+    settings = dict(settings or {}, vectorizer=vectorizer.get_params(), classifier=classifier.get_params())
+    state = checkpoint.load() if resume else None
+    if state is not None:
+        saved = state.get("settings", {})
+        changed = sorted(key for key in saved.keys() | settings.keys() if saved.get(key) != settings.get(key))
+        if changed:
+            raise ValueError(f"Checkpoint {checkpoint.path} was made with different settings ({', '.join(changed)}); "
+                             f"delete it or train without resuming")
+        classifier = state["classifier"]
+        log(f"Resuming after {state['chunks_done']} chunks ({state['rows_seen']} rows)")
+    else:
+        state = {
+            "classifier": classifier,
+            "settings": settings,
+            "chunks_done": 0,
+            "rows_seen": 0,
+            "confusion": np.zeros((2, 2), dtype=np.int64),
+        }
+
+    for index, (texts, labels) in enumerate(chunks):
+        if index < state["chunks_done"]:
+            continue
+
+        X = vectorizer.transform(clean(texts) if clean is not None else texts)
+        y = np.asarray(labels)
+        if state["rows_seen"]:
+            predicted = classifier.predict(X)
+            np.add.at(state["confusion"], (y, predicted), 1)
+        classifier.partial_fit(X, y, classes=CLASSES)
+
+        state["classifier"] = classifier
+        state["chunks_done"] = index + 1
+        state["rows_seen"] += len(y)
+        checkpoint.save(state)
+
+        confusion = state["confusion"]
+        scored = confusion.sum()
+        accuracy = np.trace(confusion) / scored if scored else float("nan")
+        log(f"chunk {index + 1}: {state['rows_seen']} rows, progressive accuracy {accuracy:.4f}")
+
+    checkpoint.clear()
+    return state
@@ -0,0 +1,53 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# Same normalization as fastApiProject/utils.clean_text, so training matches serving
+_NON_WORD_RE = re.compile(r'\W')
+# URLs are dropped first, as their own pass: a mention must not swallow the start of a URL
+_URL_RE = re.compile(r'http\S+|www\S+|https\S+')
+# Then @mentions are dropped and any other non-word character becomes a space
+_NORMALIZE_RE = re.compile(r'@\w+|(\W)')
+
+# Bump when clean_text changes so cached cleaned text is not reused
+CLEANING_VERSION = 2
+
+
+def _replace_match(match):
+    return ' ' if match.group(1) else ''
+
+
+def clean_text(text):
+    if '@' not in text and 'http' not in text and 'www' not in text:
+        return _NON_WORD_RE.sub(' ', text).lower()
+    return _NORMALIZE_RE.sub(_replace_match, _URL_RE.sub('', text)).lower()
+
+
+# Map sentiment to binary classes
+def map_sentiment(score):
+    return 1 if score == 1 else 0
+
+
+def _clean_chunk(texts):
+    return [clean_text(text) for text in texts]
+
+
+def clean_texts(texts, workers=None, chunk_size=50_000, pool=None):
+    """Clean a list of texts, split into chunks across a process pool.
+
+    workers=1 cleans in this process (no pickling overhead for small inputs). Pass an
+    existing ``pool`` to avoid starting new processes on every call.
+    """
+    texts = list(texts)
+    if (workers == 1 and pool is None) or len(texts) <= chunk_size:
+        return _clean_chunk(texts)
+
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    cleaned = []
+    if pool is not None:
+        for chunk in pool.map(_clean_chunk, chunks):
+            cleaned.extend(chunk)
+        return cleaned
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in pool.map(_clean_chunk, chunks):
+            cleaned.extend(chunk)
+    return cleaned
@@ -1,39 +1,89 @@
 import streamlit as st
 import os
+import hashlib
+import json
 import logging
+import time
 import geocoder
-from PIL import Image
 from typing import List, Dict
-import google.generativeai as genai
+
+from job_client import client_from_env
+from pre_classifier import describe, pre_classifier_from_env
+from preprocess import PreparedImage, preprocess_many
+from result_cache import cache_from_env, stream_cached
+from scrap_engine import engine_from_env, model_from_env
 
 # Additional imports for animations and styling
 from streamlit_lottie import st_lottie
 import requests
-import time
+
+# Streamlit re-runs this script on every interaction; everything that talks to the network
+# is cached so a rerun only redraws the page.
 
 # -- 1) Load Lottie animations (from URL or local JSON) --
-def load_lottieurl(url: str):
-    """Helper function to load a Lottie animation from a URL."""
+LOTTIE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lottie")
+
+
+@st.cache_resource(show_spinner=False)
+def load_lottie(url: str, name: str):
+    """Load a Lottie animation from lottie/<name>.json, downloading it there on first use."""
+    path = os.path.join(LOTTIE_DIR, f"{name}.json")
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
     try:
-        r = requests.get(url)
+        r = requests.get(url, timeout=3)
         if r.status_code != 200:
             return None
-        return r.json()
-    except:
+        animation = r.json()
+    except (requests.RequestException, ValueError):
         return None
+    try:
+        os.makedirs(LOTTIE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(animation, f)
+    except OSError as e:
+        logging.warning(f"Could not save Lottie animation {name}: {e}")
+    return animation
 
 # Example Lottie animation URLs (you can replace these with your own)
 LOTTIE_RECYCLING_URL = "https://lottie.host/65119e8e-f82c-4b53-b613-16096eb36a8e/Yrn7AjQUNK.json"
 LOTTIE_UPLOAD_URL = "https://lottie.host/f5326758-f0e1-4cdc-b702-b60760d5a86f/95NWTtRHVm.json"
 
+# SCRAP_SERVICE_URL sends classification to a running job_service.py instead of doing it here
+SERVICE_URL = os.getenv("SCRAP_SERVICE_URL")
+
 # Get the API key from the environment
 api_key = os.getenv("API_KEY")
-if not api_key:
+if not api_key and not SERVICE_URL and os.getenv("SCRAP_BACKEND", "gemini") == "gemini":
     raise ValueError("API_KEY not found. Please set it in the .env file or as an environment variable.")
 
-# Configure the Generative AI API
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel("gemini-1.5-flash")
+# Bump whenever the scrap_prompt changes so cached answers are not reused
+PROMPT_VERSION = "app-1"
+
+
+@st.cache_resource
+def get_engine():
+    """Configured model behind concurrent, rate-limited calls (see SCRAP_* variables in scrap_engine.py)."""
+    return engine_from_env(model_from_env())
+
+
+@st.cache_resource
+def get_job_client():
+    """Client for the job service at SCRAP_SERVICE_URL."""
+    return client_from_env()
+
+
+@st.cache_resource
+def get_cache():
+    """Answers for previously seen items (see SCRAP_CACHE_* variables in result_cache.py)."""
+    return cache_from_env()
+
+
+@st.cache_resource
+def get_pre_classifier():
+    """Local nearest-neighbour model for obvious items (see SCRAP_PRECLASSIFIER_* variables in pre_classifier.py)."""
+    return pre_classifier_from_env()
 
 RECYCLING_RULES = {
     "Maharashtra": [
@@ -119,27 +169,113 @@ class LocationService:
             st.warning("Location detection failed. Defaulting to Mumbai, Maharashtra.")
             return {"city": "Mumbai", "state": "Maharashtra", "country": "India"}
 
-def classify_scrap(images: List[Image.Image], location: Dict[str, str]):
-    """Classify images as recyclable or non-recyclable with Generative AI."""
-    classifications = []
+def get_session_location() -> Dict[str, str]:
+    """Location detected once per browser session instead of on every rerun."""
+    if "location" not in st.session_state:
+        st.session_state.location = LocationService.get_location()
+    return st.session_state.location
+
+def scrap_prompt(state: str) -> str:
+    return f"""
+    Classify the item in this image according to {state}, India recycling rules:
+    1. Is it recyclable?
+    2. Can it be sold to a scrap collector?
+    3. Recommendations for preparation and safe handling.
+    """
+
+def classify_scrap_stream(images: List[PreparedImage], location: Dict[str, str]):
+    """Yield classification events as answers stream in (see result_cache.stream_cached).
+
+    "text" events carry the next piece of an image's recommendation; "done" events also
+    carry the finished classification under "result". Images the pre-classifier recognises
+    finish first, without a model call.
+    """
+    if SERVICE_URL:
+        yield from classify_scrap_remote(images, location)
+        return
+
     state = location.get("state", "Maharashtra")
+    rules = RECYCLING_RULES.get(state, ["No rules available."])
+    pre_classifier = get_pre_classifier()
+
+    # Obvious items are answered on the CPU straight away; only the rest go to the model
+    local = pre_classifier.classify([image.image for image in images]) if pre_classifier else [None] * len(images)
+    escalated = []
+    for index, answer in enumerate(local):
+        if answer is None:
+            escalated.append(index)
+            continue
+        label = answer["label"]
+        recommendation = describe(label, state)
+        yield {"index": index, "type": "done", "text": recommendation, "error": None, "cached": False, "result": {
+            "image": images[index].image,
+            "recommendation": recommendation,
+            "recyclable": label["recyclable"],
+            "error": None,
+            "cached": False,
+            "local": True,
+            "recycling_rules": rules
+        }}
+
+    # The escalated images are sent at once and repeat items come from the cache
+    start = time.perf_counter()
+    for event in stream_cached(get_engine(), get_cache(), scrap_prompt(state),
+                               [images[i].image for i in escalated], state, PROMPT_VERSION,
+                               payloads=[images[i].blob() for i in escalated]):
+        event["index"] = escalated[event["index"]]
+        if event["type"] == "done":
+            if pre_classifier and not event["cached"]:
+                pre_classifier.record_escalation(time.perf_counter() - start)
+            event["result"] = {
+                "image": images[event["index"]].image,
+                "recommendation": event["text"] or f"Classification failed: {event['error']}",
+                "error": event["error"],
+                "cached": event["cached"],
+                "local": False,
+                "recycling_rules": rules
+            }
+        yield event
+
+def classify_scrap_remote(images: List[PreparedImage], location: Dict[str, str]):
+    """Yield "done" events from a job on the job service once the whole job has finished."""
+    uploads = [(f"image{i}", image.data, image.mime_type) for i, image in enumerate(images)]
+    try:
+        results = get_job_client().classify(uploads, location)
+    except Exception as e:
+        results = [{"recommendation": "", "error": f"{type(e).__name__}: {e}", "cached": False,
+                    "recycling_rules": []} for _ in images]
+    for index, result in enumerate(results):
+        result["image"] = images[index].image
+        if isinstance(result["recycling_rules"], str):
+            result["recycling_rules"] = [result["recycling_rules"]]
+        yield {"index": index, "type": "done", "text": result["recommendation"], "error": result["error"],
+               "cached": result["cached"], "result": result}
+
+def render_result(result: Dict):
+    """Status box, recommendation and rules of one finished classification."""
+    if result['error']:
+        st.error(f"Could not classify this image: {result['error']}")
+        return
 
-    for image in images:
-        prompt = f"""
-        Classify the item in this image according to {state}, India recycling rules:
-        1. Is it recyclable?
-        2. Can it be sold to a scrap collector?
-        3. Recommendations for preparation and safe handling.
-        """
-        # In practice, you may need a different approach to pass images to the model
-        # For demonstration, we treat the image as a separate input or handle as text-based prompt
-        response = model.generate_content([prompt, "Image placeholder"])
-        classifications.append({
-            "image": image,
-            "recommendation": response.text,
-            "recycling_rules": RECYCLING_RULES.get(state, ["No rules available."])
-        })
-    return classifications
+    # Local answers know whether the item is recyclable; for model answers it is read off the text
+    is_recyclable = result.get('recyclable')
+    if is_recyclable is None:
+        recommendation_lower = result['recommendation'].lower()
+        is_recyclable = "yes" in recommendation_lower or "recyclable" in recommendation_lower
+
+    if is_recyclable:
+        box_class = "box box-recyclable"
+        status_header = "### This item may be Recyclable!"
+    else:
+        box_class = "box box-nonrecyclable"
+        status_header = "### This item may Not be Recyclable or Needs Special Handling!"
+
+    st.markdown(f"<div class='{box_class}'>{status_header}</div>", unsafe_allow_html=True)
+    st.write(f"**Recommendation:** {result['recommendation']}")
+    st.markdown("---")
+    st.markdown("<span class='rules'>Recycling Rules:</span>", unsafe_allow_html=True)
+    for rule in result['recycling_rules']:
+        st.write(f"- {rule}")
 
 def main():
     # -- 2) Custom CSS for minor transitions or styling --
@@ -177,14 +313,14 @@ def main():
     st.sidebar.header("Upload and Classify Scrap")
 
     # -- 3) Lottie animations in the sidebar or main page --
-    lottie_recycling = load_lottieurl(LOTTIE_RECYCLING_URL)
-    lottie_upload = load_lottieurl(LOTTIE_UPLOAD_URL)
+    lottie_recycling = load_lottie(LOTTIE_RECYCLING_URL, "recycling")
+    lottie_upload = load_lottie(LOTTIE_UPLOAD_URL, "upload")
 
     if lottie_recycling:
         st_lottie(lottie_recycling, speed=1, height=200, key="recycling")
 
     # User location
-    location = LocationService.get_location()
+    location = get_session_location()
     st.sidebar.write(f"Detected Location: {location['city']}, {location['state']}")
 
     # -- 4) Lottie animation near file uploader for better user experience --
@@ -201,34 +337,85 @@ def main():
 
     # Process uploaded files
     if uploaded_files:
-        # We'll add a small spinner as we process images
-        with st.spinner("Classifying your scrap..."):
-            time.sleep(1)  # Just to simulate a little delay
-            images = [Image.open(file) for file in uploaded_files]
-            results = classify_scrap(images, location)
-
-        # Once classification is done, we show results with a bit of flair
-        st.balloons()  # Celebratory effect
-        for i, result in enumerate(results):
-            st.image(images[i], caption=f"Uploaded Image {i + 1}")
-
-            # Determine if the recommendation text suggests recyclable or not
-            recommendation_lower = result['recommendation'].lower()
-            is_recyclable = "yes" in recommendation_lower or "recyclable" in recommendation_lower
-            
-            if is_recyclable:
-                box_class = "box box-recyclable"
-                status_header = "### This item may be Recyclable!"
-            else:
-                box_class = "box box-nonrecyclable"
-                status_header = "### This item may Not be Recyclable or Needs Special Handling!"
-
-            st.markdown(f"<div class='{box_class}'>{status_header}</div>", unsafe_allow_html=True)
-            st.write(f"**Recommendation:** {result['recommendation']}")
-            st.markdown("---")
-            st.markdown("<span class='rules'>Recycling Rules:</span>", unsafe_allow_html=True)
-            for rule in result['recycling_rules']:
-                st.write(f"- {rule}")
+        # Results are kept per session, keyed by file content and state, so reruns only
+        # classify files that were not seen before
+        keys = [(hashlib.sha256(file.getvalue()).hexdigest(), location["state"]) for file in uploaded_files]
+        results_by_file = st.session_state.get("results", {})
+        # key -> upload positions showing that file (the same photo can be uploaded twice)
+        pending = {}
+        bodies = {}
+
+        # One card per upload in upload order; known results are drawn right away and the
+        # others get a placeholder that fills in as soon as their answer streams in
+        for i, (key, file) in enumerate(zip(keys, uploaded_files)):
+            with st.container():
+                if key in results_by_file:
+                    st.image(results_by_file[key]['image'], caption=f"Uploaded Image {i + 1}")
+                    render_result(results_by_file[key])
+                    continue
+                pending.setdefault(key, []).append(i)
+                image_slot = st.empty()
+                bodies.setdefault(key, []).append((i, image_slot, st.empty()))
+
+        if pending:
+            total = sum(len(positions) for positions in pending.values())
+            progress = st.progress(0.0, text=f"Classifying your scrap: 0 of {total} images done")
+            # The uploader only checks extensions, so a corrupt or renamed file fails on its own card
+            prepared = preprocess_many([uploaded_files[positions[0]] for positions in pending.values()],
+                                       return_exceptions=True)
+            images = []
+            pending_keys = []
+            done = 0
+            for key, image in zip(pending, prepared):
+                if isinstance(image, Exception):
+                    for i, image_slot, body in bodies[key]:
+                        image_slot.empty()
+                        body.error(f"Could not read Uploaded Image {i + 1} ({uploaded_files[i].name}): {image}")
+                    done += len(pending[key])
+                    continue
+                images.append(image)
+                pending_keys.append(key)
+                for i, image_slot, body in bodies[key]:
+                    image_slot.image(image.image, caption=f"Uploaded Image {i + 1}")
+                    body.info("Waiting for the classifier...")
+            if done:
+                progress.progress(done / total, text=f"Classifying your scrap: {done} of {total} images done")
+
+            streamed = {}
+            for event in classify_scrap_stream(images, location):
+                key = pending_keys[event["index"]]
+                if event["type"] == "text":
+                    streamed[key] = streamed.get(key, "") + event["text"]
+                    for _, _, body in bodies[key]:
+                        body.markdown(f"**Recommendation:** {streamed[key]}▌")
+                    continue
+
+                # Failures (a 503, a timeout) are shown but not kept, so the next rerun tries again
+                if event["result"]["error"] is None:
+                    results_by_file[key] = event["result"]
+                for _, _, body in bodies[key]:
+                    with body.container():
+                        render_result(event["result"])
+                done += len(pending[key])
+                progress.progress(done / total, text=f"Classifying your scrap: {done} of {total} images done")
+
+            progress.empty()
+            # Once classification is done, we show results with a bit of flair
+            st.balloons()  # Celebratory effect
+        # Forget files that were removed from the uploader
+        st.session_state.results = {key: results_by_file[key] for key in keys if key in results_by_file}
+
+        # In-process counters; with a job service they live in its /stats instead
+        cache = None if SERVICE_URL else get_cache()
+        if cache is not None:
+            stats = cache.stats()
+            st.sidebar.caption(f"Cache: {stats['hits']} hits, {stats['misses']} misses "
+                               f"({stats['hit_rate']:.0%} hit rate, {stats['entries']} items)")
+        pre_classifier = None if SERVICE_URL else get_pre_classifier()
+        if pre_classifier is not None:
+            stats = pre_classifier.stats()
+            st.sidebar.caption(f"Answered locally: {stats['local']} images, {stats['escalated']} sent to the model "
+                               f"({stats['escalation_rate']:.0%} escalated, about {stats['latency_saved_seconds']:.1f}s saved)")
 
     else:
         st.info("Please upload one or more images to proceed.")
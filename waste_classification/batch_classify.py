@@ -0,0 +1,254 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import as_completed
+from typing import Dict, List
+
+from pre_classifier import describe, pre_classifier_from_env
+from preprocess import PreparedImage, preprocess_many
+from result_cache import cache_from_env, dhash
+from scrap_engine import engine_from_env, model_from_env
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+# Bump whenever the pack prompt or the response fields change so cached answers are not reused
+PROMPT_VERSION = "batch-1"
+RESPONSE_CONFIG = {"response_mime_type": "application/json"}
+
+
+def find_images(directory: str) -> List[str]:
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_finished(output: str) -> Dict[str, str]:
+    """path -> sha256 of every image already classified without error in the output JSONL.
+
+    The output doubles as the checkpoint: a crashed run leaves at most a torn last line,
+    which is ignored, and failed images are tried again on the next run.
+    """
+    finished = {}
+    if not os.path.exists(output):
+        return finished
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("error") is None:
+                finished[record["path"]] = record["sha256"]
+            else:
+                finished.pop(record["path"], None)
+    return finished
+
+
+def pack_prompt(state: str, count: int) -> str:
+    return f"""
+    You are given {count} images of items a user wishes to sell to a local scrap collector in {state}, India.
+    The images are numbered 1 to {count} in the order they are given. For each image return one JSON object with:
+    - "image": the image number
+    - "item": a short name for the item
+    - "recyclable": true if the item is recyclable according to {state} recycling guidelines
+    - "sellable": true if it can be sold to a scrap collector or has resale value
+    - "recommendation": how to prepare, handle and store the item before handing it over
+    Answer with a JSON array of exactly {count} objects.
+    """
+
+
+def build_request(state: str, images: List[PreparedImage]) -> list:
+    contents = [pack_prompt(state, len(images))]
+    for n, image in enumerate(images, 1):
+        contents += [f"Image {n}:", image.blob()]
+    return contents
+
+
+def parse_pack(text: str, count: int) -> List[Dict]:
+    """Per-image answers of a pack in image order; images missing from the answer get an error."""
+    try:
+        entries = json.loads(text)
+    except ValueError as e:
+        return [{"error": f"Invalid JSON response: {e}"}] * count
+    if isinstance(entries, dict):
+        entries = [entries]
+
+    by_number = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if isinstance(entry, dict) and isinstance(entry.get("image"), int):
+            by_number[entry["image"]] = entry
+    answers = []
+    for n in range(1, count + 1):
+        entry = by_number.get(n)
+        if entry is None:
+            answers.append({"error": f"Image {n} missing from the response"})
+        else:
+            answers.append({
+                "item": entry.get("item"),
+                "recyclable": bool(entry.get("recyclable")),
+                "sellable": bool(entry.get("sellable")),
+                "recommendation": entry.get("recommendation"),
+                "error": None,
+            })
+    return answers
+
+
+def _timed_generate(engine, contents):
+    start = time.perf_counter()
+    response = engine.generate(contents, generation_config=RESPONSE_CONFIG)
+    return response, time.perf_counter() - start
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def classify_directory(directory: str, output: str, state: str, engine, cache=None, images_per_request: int = 8,
+                       pre_classifier=None, log=print) -> Dict:
+    """Classify every image under ``directory`` into ``output`` JSONL, skipping finished ones.
+
+    Images the ``pre_classifier`` recognises are answered locally and never sent to the model.
+    """
+    paths = find_images(directory)
+    finished = load_finished(output)
+    todo = []
+    for path in paths:
+        digest = file_digest(path)
+        if finished.get(path) != digest:
+            todo.append((path, digest))
+    log(f"{len(paths)} images found, {len(paths) - len(todo)} already classified, {len(todo)} to go")
+
+    stats = {"images": 0, "requests": 0, "cached": 0, "duplicates": 0, "local": 0, "errors": 0, "bytes_sent": 0, "bytes_saved": 0}
+    start = time.perf_counter()
+    with open(output, "a+", encoding="utf-8") as out:
+        # Start on a fresh line if the last run died halfway through writing one
+        if out.tell():
+            out.seek(out.tell() - 1)
+            if out.read(1) != "\n":
+                out.write("\n")
+
+        def write(path, digest, answer, cached, request_seconds=None, local=False):
+            record = dict({"path": path, "sha256": digest, "state": state, "cached": cached, "local": local,
+                           "request_seconds": request_seconds}, **answer)
+            out.write(json.dumps(record) + "\n")
+            # Flushed and synced per record, so a crash never loses paid-for answers
+            out.flush()
+            os.fsync(out.fileno())
+            stats["images"] += 1
+            stats["errors"] += answer["error"] is not None
+
+        # Enough images in flight to keep every engine worker busy, without preparing the whole directory
+        window = images_per_request * engine.max_concurrency * 2
+        for group in _chunks(todo, window):
+            prepared = preprocess_many([path for path, _ in group], return_exceptions=True)
+            # An unreadable or truncated file gets an error record; the rest of the group goes on
+            readable = []
+            for (path, digest), image in zip(group, prepared):
+                if isinstance(image, Exception):
+                    write(path, digest, {"error": f"Could not read image: {type(image).__name__}: {image}"}, cached=False)
+                else:
+                    readable.append((path, digest, image))
+
+            images = [image.image for _, _, image in readable]
+            local = pre_classifier.classify(images) if pre_classifier else [None] * len(readable)
+            # image hash -> the group's images waiting for that answer; identical photos are sent once
+            misses = {}
+            for (path, digest, image), known in zip(readable, local):
+                if known is not None:
+                    label = known["label"]
+                    stats["local"] += 1
+                    write(path, digest, {"item": label["item"], "recyclable": label["recyclable"],
+                                         "sellable": label["sellable"], "recommendation": describe(label, state),
+                                         "error": None}, cached=False, local=True)
+                    continue
+                image_hash = dhash(image.image)
+                answer = cache.get(image_hash, state, PROMPT_VERSION) if cache is not None else None
+                if answer is not None:
+                    stats["cached"] += 1
+                    write(path, digest, json.loads(answer), cached=True)
+                else:
+                    misses.setdefault(image_hash, []).append((path, digest, image))
+
+            futures = {}
+            for pack in _chunks(list(misses.items()), images_per_request):
+                contents = build_request(state, [waiting[0][2] for _, waiting in pack])
+                futures[engine.submit(_timed_generate, engine, contents)] = pack
+                stats["requests"] += 1
+                stats["duplicates"] += sum(len(waiting) - 1 for _, waiting in pack)
+                for _, waiting in pack:
+                    stats["bytes_sent"] += waiting[0][2].stats["prepared_bytes"]
+                    stats["bytes_saved"] += waiting[0][2].stats["saved_bytes"]
+
+            for future in as_completed(futures):
+                pack = futures[future]
+                try:
+                    response, request_seconds = future.result()
+                    answers = parse_pack(response.text, len(pack))
+                    if pre_classifier is not None:
+                        pre_classifier.record_escalation(request_seconds, len(pack))
+                except Exception as e:
+                    answers = [{"error": f"{type(e).__name__}: {e}"}] * len(pack)
+                    request_seconds = None
+                for (image_hash, waiting), answer in zip(pack, answers):
+                    if answer["error"] is None and cache is not None:
+                        cache.put(image_hash, state, PROMPT_VERSION, json.dumps(answer))
+                    for path, digest, _ in waiting:
+                        write(path, digest, answer, cached=False, request_seconds=request_seconds)
+
+            elapsed = time.perf_counter() - start
+            log(f"{stats['images']}/{len(todo)} images, {stats['requests']} requests, "
+                f"{stats['images'] / elapsed * 60:.1f} images/min")
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["images_per_minute"] = stats["images"] / stats["seconds"] * 60 if stats["seconds"] else 0.0
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify a directory of scrap photos into a JSONL file.")
+    parser.add_argument("directory")
+    parser.add_argument("--output", default="classifications.jsonl",
+                        help="results, one JSON object per image; also the checkpoint for resuming")
+    parser.add_argument("--state", default="Maharashtra", help="state whose recycling rules apply")
+    parser.add_argument("--images-per-request", type=int, default=8)
+    parser.add_argument("--no-cache", action="store_true", help="do not use or fill the classification cache")
+    parser.add_argument("--no-local", action="store_true", help="send every image to the model, skipping the pre-classifier")
+    parser.add_argument("--fake", action="store_true", help="use the local fake model instead of Gemini (same as SCRAP_BACKEND=fake)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.fake:
+        os.environ["SCRAP_BACKEND"] = "fake"
+    model = model_from_env()
+
+    engine = engine_from_env(model)
+    cache = None if args.no_cache else cache_from_env()
+    pre_classifier = None if args.no_local else pre_classifier_from_env()
+    try:
+        stats = classify_directory(args.directory, args.output, args.state, engine, cache,
+                                   images_per_request=args.images_per_request, pre_classifier=pre_classifier)
+    finally:
+        engine.shutdown()
+    print(f"{stats['images']} images in {stats['seconds']:.1f}s ({stats['images_per_minute']:.1f} images/min), "
+          f"{stats['requests']} requests, {stats['cached']} from cache, {stats['duplicates']} duplicates, "
+          f"{stats['local']} answered locally, {stats['errors']} errors, "
+          f"{stats['bytes_sent']} bytes sent ({stats['bytes_saved']} saved by preprocessing)")
+    if pre_classifier is not None:
+        local = pre_classifier.stats()
+        print(f"Pre-classifier: {local['escalation_rate']:.0%} escalated, "
+              f"about {local['latency_saved_seconds']:.1f}s of model time saved")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import json
+import random
+import threading
+import time
+
+
+class ServiceUnavailable(Exception):
+    """Same name as google.api_core's 503 error, so the engine treats it as transient."""
+
+
+class DeadlineExceeded(Exception):
+    """Same name as google.api_core's 504 error, raised when a call exceeds its timeout."""
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Stand-in for genai.GenerativeModel that simulates latency and transient failures.
+
+    Each call sleeps ``latency`` seconds (plus or minus ``jitter`` as a fraction), then
+    fails with ServiceUnavailable with probability ``failure_rate``. A call slower than
+    its ``request_options["timeout"]`` raises DeadlineExceeded. With ``stream=True`` the
+    latency is the time to the first chunk, and the answer then arrives word by word
+    every ``chunk_delay`` seconds. Calls and peak concurrency are counted so tests can
+    check what the caller did.
+    """
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.2, failure_rate: float = 0.0, seed=None,
+                 text: str = None, chunk_delay: float = 0.02):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_delay = chunk_delay
+        self.failure_rate = failure_rate
+        self.text = text
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _answer(self, contents, generation_config=None) -> str:
+        if self.text is not None:
+            return self.text
+        if (generation_config or {}).get("response_mime_type") == "application/json":
+            # One entry per image part, like a structured multi-image request expects
+            images = sum(not isinstance(part, str) for part in contents)
+            return json.dumps([
+                {"image": n, "item": "fake item", "recyclable": True, "sellable": True,
+                 "recommendation": "Clean and dry it before handing it over."}
+                for n in range(1, images + 1)
+            ])
+        prompt = next((part for part in contents if isinstance(part, str)), "")
+        return (
+            "1. Recyclable: yes, this item is recyclable.\n"
+            "2. Sellable: yes, it is sellable to a scrap collector.\n"
+            f"3. Clean and dry it before handing it over. (fake answer, prompt of {len(prompt)} chars)"
+        )
+
+    def _start(self):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            delay = self.latency * (1 + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.failure_rate
+        return delay, fail
+
+    def _finish(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    @staticmethod
+    def _wait(delay: float, fail: bool, request_options):
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise DeadlineExceeded(f"fake call took longer than {timeout}s")
+        time.sleep(delay)
+        if fail:
+            raise ServiceUnavailable("fake model is overloaded")
+
+    def generate_content(self, contents, request_options=None, stream: bool = False, **kwargs):
+        if stream:
+            return self._stream(contents, request_options)
+        delay, fail = self._start()
+        try:
+            self._wait(delay, fail, request_options)
+            return FakeResponse(self._answer(contents, kwargs.get("generation_config")))
+        finally:
+            self._finish()
+
+    def _stream(self, contents, request_options):
+        delay, fail = self._start()
+        try:
+            self._wait(delay, fail, request_options)
+            words = self._answer(contents).split(" ")
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(self.chunk_delay)
+                yield FakeResponse(word if i == len(words) - 1 else word + " ")
+        finally:
+            self._finish()
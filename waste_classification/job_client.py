@@ -0,0 +1,69 @@
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+
+class JobFailed(Exception):
+    """Raised when the job service could not classify a job."""
+
+
+class ScrapJobClient:
+    """Submits classification jobs to job_service.py and polls until they finish.
+
+    Images are (name, bytes, mime type) tuples. A busy service (503) is retried up to
+    ``retries`` times, waiting as long as its Retry-After header asks.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 10.0, poll_interval: float = 0.5, retries: int = 5):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.retries = retries
+        self.session = requests.Session()
+
+    def submit(self, images: List[Tuple[str, bytes, str]], location: Dict[str, str]) -> Dict:
+        """Queue a job and return its status, including "job_id"."""
+        files = [("files", image) for image in images]
+        data = {"state": location.get("state", "Maharashtra"), "city": location.get("city", "Unknown")}
+        for attempt in range(self.retries + 1):
+            response = self.session.post(f"{self.base_url}/jobs", files=files, data=data, timeout=self.timeout)
+            if response.status_code != 503 or attempt == self.retries:
+                break
+            time.sleep(float(response.headers.get("Retry-After", 1)))
+        response.raise_for_status()
+        return response.json()
+
+    def status(self, job_id: str) -> Dict:
+        response = self.session.get(f"{self.base_url}/jobs/{job_id}", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def result(self, job_id: str) -> Dict:
+        response = self.session.get(f"{self.base_url}/jobs/{job_id}/result", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def wait(self, job_id: str, timeout: float = 300.0) -> Dict:
+        """Poll until the job has finished and return its result."""
+        deadline = time.monotonic() + timeout
+        while self.status(job_id)["status"] in ("queued", "running"):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Job {job_id} did not finish within {timeout:.0f}s")
+            time.sleep(self.poll_interval)
+        job = self.result(job_id)
+        if job["status"] == "failed":
+            raise JobFailed(job["error"])
+        return job
+
+    def classify(self, images: List[Tuple[str, bytes, str]], location: Dict[str, str],
+                 timeout: float = 300.0) -> List[Dict]:
+        """Classifications of ``images`` in order, as waste_info.classify_scrap returns them."""
+        return self.wait(self.submit(images, location)["job_id"], timeout=timeout)["results"]
+
+
+def client_from_env() -> Optional[ScrapJobClient]:
+    """Client for the service at SCRAP_SERVICE_URL, or None to classify in-process."""
+    url = os.getenv("SCRAP_SERVICE_URL")
+    return ScrapJobClient(url) if url else None
@@ -0,0 +1,200 @@
+import io
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from PIL import Image
+
+# Importing waste_info builds the engine, cache and pre-classifier from the SCRAP_* variables;
+# SCRAP_BACKEND=fake serves jobs from the local fake model
+from waste_info import cache, classify_scrap, engine, pre_classifier
+
+#run this command to start the service    uvicorn job_service:app --port 8001
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue is full and the job was not accepted."""
+
+
+class JobQueue:
+    """Bounded in-process queue of jobs served by a pool of worker threads.
+
+    Each job runs ``handler(*args)``. Finished jobs, with their result or error, are kept
+    for ``retention`` seconds so clients can collect them, then forgotten.
+    """
+
+    def __init__(self, handler, workers: int = 4, max_queued: int = 64, retention: float = 3600.0):
+        self.handler = handler
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"scrap-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, *args, **info) -> Dict:
+        """Queue a job and return its status; ``info`` is echoed back in every status."""
+        self._expire()
+        job = {"job_id": uuid.uuid4().hex, "status": "queued", "submitted_at": time.time(),
+               "started_at": None, "finished_at": None, "error": None, "result": None, "info": info}
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+        try:
+            self._queue.put_nowait((job, args))
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job["job_id"]]
+            raise JobQueueFull(f"Job queue is full ({self.max_queued} jobs waiting)")
+        return self.status(job["job_id"])
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """Status and timings of a job, without its result; None for unknown or expired jobs."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+        now = time.time()
+        started = job["started_at"] or now
+        finished = job["finished_at"] or now
+        return dict(job["info"], job_id=job_id, status=job["status"], error=job["error"], timings={
+            "queued_seconds": round(started - job["submitted_at"], 3),
+            "run_seconds": round(finished - started, 3) if job["started_at"] else 0.0,
+            "total_seconds": round(finished - job["submitted_at"], 3),
+        })
+
+    def result(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job and job["result"]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            statuses = [job["status"] for job in self._jobs.values()]
+        stats = {status: statuses.count(status) for status in ("queued", "running", "done", "failed")}
+        stats.update(workers=self.workers, max_queued=self.max_queued)
+        return stats
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                job, args = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._lock:
+                job["status"] = "running"
+                job["started_at"] = time.time()
+            try:
+                result, status, error = self.handler(*args), "done", None
+            except Exception as e:
+                logging.exception(f"Job {job['job_id']} failed")
+                result, status, error = None, "failed", f"{type(e).__name__}: {e}"
+            with self._lock:
+                job.update(status=status, result=result, error=error, finished_at=time.time())
+
+    def _expire(self):
+        cutoff = time.time() - self.retention
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job["finished_at"] is not None and job["finished_at"] < cutoff]:
+                del self._jobs[job_id]
+
+    def shutdown(self):
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+
+
+def run_job(uploads: List[Tuple[str, bytes]], location: Dict[str, str]) -> List[Dict]:
+    classifications = classify_scrap([data for _, data in uploads], location)
+    for (name, _), classification in zip(uploads, classifications):
+        classification["image"] = name
+    return classifications
+
+
+jobs = JobQueue(
+    run_job,
+    workers=int(os.getenv("SCRAP_JOB_WORKERS", "4")),
+    max_queued=int(os.getenv("SCRAP_JOB_QUEUE_SIZE", "64")),
+    retention=float(os.getenv("SCRAP_JOB_RETENTION_SECONDS", "3600")),
+)
+MAX_IMAGES = int(os.getenv("SCRAP_JOB_MAX_IMAGES", "20"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    jobs.start()
+    yield
+    jobs.shutdown()
+    engine.shutdown()
+    if cache is not None:
+        cache.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(files: List[UploadFile] = File(...), state: str = Form("Maharashtra"),
+                     city: str = Form("Unknown")):
+    if len(files) > MAX_IMAGES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_IMAGES} images per job")
+    uploads = [(file.filename, await file.read()) for file in files]
+    # Reject anything that is not an image up front instead of failing the job in a worker;
+    # verify() checks the header and structure without decoding the pixels
+    for name, data in uploads:
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image.verify()
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"{name} is not a readable image: {type(e).__name__}: {e}")
+    location = {"city": city, "state": state, "country": "India"}
+    try:
+        job = jobs.submit(uploads, location, images=len(uploads), state=state)
+    except JobQueueFull as e:
+        # Busy, not broken: clients should try again shortly
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    return JSONResponse(job, status_code=202, headers={"Location": f"/jobs/{job['job_id']}"})
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    if job["status"] in ("queued", "running"):
+        raise HTTPException(status_code=409, detail=f"Job is still {job['status']}")
+    return dict(job, results=jobs.result(job_id))
+
+
+@app.get("/stats")
+async def get_stats():
+    return {
+        "jobs": jobs.stats(),
+        "engine": engine.stats(),
+        "cache": cache.stats() if cache is not None else None,
+        "pre_classifier": pre_classifier.stats() if pre_classifier is not None else None,
+    }
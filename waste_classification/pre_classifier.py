@@ -0,0 +1,270 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EXAMPLES_PATH = os.path.join(HERE, "pre_classifier_examples.json")
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+# Per-channel mean and std the encoder was trained with
+NORMALIZATION = {
+    "imagenet": ([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+    "clip": ([0.48145466, 0.4578275, 0.40821073], [0.26862954, 0.26130258, 0.27577711]),
+}
+
+
+# Outputs that already hold one embedding per image, preferred when no output is named
+EMBEDDING_OUTPUTS = ("image_embeds", "pooler_output")
+
+
+class ImageEncoder:
+    """Pretrained image encoder (e.g. a CLIP vision tower or a MobileNet trunk) run with onnxruntime on CPU.
+
+    The model takes a float NCHW batch. ``output`` names the model output to use; by
+    default it is image_embeds or pooler_output when the model has one, else the first
+    output. A [N, D] output is used as is, [N, C, H, W] feature maps are average-pooled,
+    and [N, tokens, D] hidden states are reduced with ``token_pooling``: "cls" takes the
+    first token, "mean" averages over tokens. Embeddings are L2-normalised, so a dot
+    product is the cosine similarity.
+    """
+
+    def __init__(self, path: str, normalization: str = "clip", size: int = 224, threads: int = None,
+                 output: str = None, token_pooling: str = "cls"):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        names = [model_output.name for model_output in self.session.get_outputs()]
+        if output is None:
+            output = next((name for name in EMBEDDING_OUTPUTS if name in names), names[0])
+        elif output not in names:
+            raise ValueError(f"Model has no output {output!r}; outputs are {', '.join(names)}")
+        if token_pooling not in ("cls", "mean"):
+            raise ValueError(f"Unknown token pooling: {token_pooling!r} (expected 'cls' or 'mean')")
+        self.output = output
+        self.token_pooling = token_pooling
+        # Static sizes in the model win over the configured ones
+        self.size = model_input.shape[-1] if isinstance(model_input.shape[-1], int) else size
+        self.batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+        mean, std = NORMALIZATION[normalization]
+        self.mean = np.array(mean, dtype=np.float32)[:, None, None]
+        self.std = np.array(std, dtype=np.float32)[:, None, None]
+
+    def _pixels(self, image: Image.Image) -> np.ndarray:
+        # Shorter side to the input size, then a centre crop
+        image = image.convert("RGB")
+        scale = self.size / min(image.size)
+        width, height = max(self.size, round(image.width * scale)), max(self.size, round(image.height * scale))
+        image = image.resize((width, height), Image.BICUBIC)
+        left, top = (width - self.size) // 2, (height - self.size) // 2
+        image = image.crop((left, top, left + self.size, top + self.size))
+        pixels = np.asarray(image, dtype=np.float32).transpose(2, 0, 1) / 255.0
+        return (pixels - self.mean) / self.std
+
+    def embed(self, images: List[Image.Image]) -> np.ndarray:
+        if not images:
+            return np.zeros((0, 0), dtype=np.float32)
+        batch = np.stack([self._pixels(image) for image in images])
+        step = self.batch or len(batch)
+        features = np.concatenate([self.session.run([self.output], {self.input_name: batch[i:i + step]})[0]
+                                   for i in range(0, len(batch), step)])
+        if features.ndim == 3:
+            features = features[:, 0] if self.token_pooling == "cls" else features.mean(axis=1)
+        elif features.ndim == 4:
+            features = features.mean(axis=(2, 3))
+        elif features.ndim != 2:
+            raise ValueError(f"Output {self.output!r} has shape {features.shape}; expected 2, 3 or 4 dimensions")
+        return features / np.maximum(np.linalg.norm(features, axis=1, keepdims=True), 1e-12)
+
+
+def _example_paths(entries: List[str], directory: str) -> List[str]:
+    """Image files named by an examples list; a directory stands for every image in it."""
+    paths = []
+    for entry in entries:
+        path = os.path.join(directory, entry)
+        if os.path.isdir(path):
+            paths += sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS)
+        else:
+            paths.append(path)
+    return paths
+
+
+class PreClassifier:
+    """Nearest-neighbour classifier over labelled example photos, used before the LLM.
+
+    Each category has several example photos embedded with ``encoder``. An image is
+    answered locally when its best cosine similarity to any example reaches ``threshold``;
+    anything less certain is escalated. The threshold should come from ``calibrate`` on
+    held-out photos. The labels carry the recyclable and sellable flags explicitly, so
+    local answers do not depend on parsing model text.
+    """
+
+    def __init__(self, encoder: ImageEncoder, categories: List[Dict], threshold: float):
+        self.encoder = encoder
+        self.threshold = threshold
+        self.labels = []
+        embeddings = []
+        for category in categories:
+            for path in category["paths"]:
+                with Image.open(path) as image:
+                    embeddings.append(encoder.embed([image])[0])
+                self.labels.append(dict(category["label"], name=category["name"]))
+        self.index = np.stack(embeddings)
+        self._lock = threading.Lock()
+        self._stats = {"local": 0, "escalated": 0, "local_seconds": 0.0, "escalated_seconds": 0.0, "escalated_timed": 0}
+
+    @staticmethod
+    def read_examples(path: str = EXAMPLES_PATH) -> Dict:
+        """Examples file: {"threshold", "categories": [{"name", "label", "examples": [files or directories]}]}."""
+        with open(path) as f:
+            config = json.load(f)
+        directory = os.path.dirname(os.path.abspath(path))
+        for category in config["categories"]:
+            category["paths"] = _example_paths(category["examples"], directory)
+        return config
+
+    def nearest(self, images: List[Image.Image]):
+        """(label, similarity) of the closest example for each image."""
+        similarities = self.encoder.embed(images) @ self.index.T
+        best = similarities.argmax(axis=1)
+        return [(self.labels[i], float(similarities[row, i])) for row, i in enumerate(best)]
+
+    def classify(self, images: List[Image.Image]) -> List[Optional[Dict]]:
+        """Local answer per image ({"label", "similarity"}), or None where the LLM is needed."""
+        if not images:
+            return []
+        start = time.perf_counter()
+        matches = self.nearest(images)
+        seconds = time.perf_counter() - start
+        answers = [{"label": label, "similarity": similarity} if similarity >= self.threshold else None
+                   for label, similarity in matches]
+        with self._lock:
+            self._stats["local"] += sum(answer is not None for answer in answers)
+            self._stats["escalated"] += sum(answer is None for answer in answers)
+            self._stats["local_seconds"] += seconds
+        return answers
+
+    def record_escalation(self, seconds: float, images: int = 1):
+        """Report how long escalated images waited for the model, to estimate the latency saved locally."""
+        with self._lock:
+            self._stats["escalated_seconds"] += seconds * images
+            self._stats["escalated_timed"] += images
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats["local"] + stats["escalated"]
+        stats["escalation_rate"] = stats["escalated"] / total if total else 0.0
+        # Every local answer saves roughly one average escalated round trip
+        average = stats["escalated_seconds"] / stats["escalated_timed"] if stats["escalated_timed"] else 0.0
+        stats["latency_saved_seconds"] = max(0.0, stats["local"] * average - stats["local_seconds"])
+        return stats
+
+
+def calibrate(pre_classifier: PreClassifier, held_out: str, precision: float = 0.98) -> Dict:
+    """Lowest threshold whose local answers reach ``precision`` on held-out photos.
+
+    ``held_out`` has one sub-directory per category name with photos of other instances
+    of that item (never the example photos themselves), plus optionally "other" for items
+    outside every category, which must always be escalated.
+    """
+    scored = []
+    for name in sorted(os.listdir(held_out)):
+        paths = _example_paths([name], held_out) if os.path.isdir(os.path.join(held_out, name)) else []
+        for path in paths:
+            with Image.open(path) as image:
+                label, similarity = pre_classifier.nearest([image])[0]
+            scored.append((similarity, label["name"] == name))
+    if not scored:
+        raise ValueError(f"No held-out photos found under {held_out}")
+
+    # Walk from the most similar down; every prefix is what one threshold would answer locally
+    scored.sort(reverse=True)
+    threshold, correct = None, 0
+    for answered, (similarity, right) in enumerate(scored, 1):
+        correct += right
+        if correct / answered >= precision and (answered == len(scored) or scored[answered][0] < similarity):
+            threshold, coverage, achieved = similarity, answered / len(scored), correct / answered
+    if threshold is None:
+        return {"threshold": None, "photos": len(scored), "coverage": 0.0, "precision": None}
+    return {"threshold": threshold, "photos": len(scored), "coverage": coverage, "precision": achieved}
+
+
+def describe(label: Dict, state: str) -> str:
+    """Recommendation text for a locally classified item, in the shape of a model answer."""
+    return (
+        f"{label['item']} ({label['category']}).\n"
+        f"1. Recyclable: {'yes' if label['recyclable'] else 'no'}, under {state} recycling guidelines.\n"
+        f"2. Sellable to a scrap collector: {'yes' if label['sellable'] else 'no'}.\n"
+        f"3. {label['recommendation']}"
+    )
+
+
+def encoder_from_env() -> Optional[ImageEncoder]:
+    path = os.getenv("SCRAP_PRECLASSIFIER_MODEL")
+    if not path:
+        return None
+    return ImageEncoder(path, normalization=os.getenv("SCRAP_PRECLASSIFIER_NORMALIZATION", "clip"),
+                        size=int(os.getenv("SCRAP_PRECLASSIFIER_SIZE", "224")),
+                        output=os.getenv("SCRAP_PRECLASSIFIER_OUTPUT") or None,
+                        token_pooling=os.getenv("SCRAP_PRECLASSIFIER_TOKEN_POOLING", "cls"))
+
+
+def pre_classifier_from_env() -> Optional[PreClassifier]:
+    """PreClassifier from SCRAP_PRECLASSIFIER_* variables, or None when it is not set up.
+
+    Needs an ONNX image encoder (SCRAP_PRECLASSIFIER_MODEL) and a threshold, either
+    calibrated into the examples file or from SCRAP_PRECLASSIFIER_THRESHOLD; a threshold
+    above 1 disables the cascade. Without both every image goes to the model.
+    """
+    encoder = encoder_from_env()
+    if encoder is None:
+        return None
+    config = PreClassifier.read_examples(os.getenv("SCRAP_PRECLASSIFIER_EXAMPLES", EXAMPLES_PATH))
+    threshold = os.getenv("SCRAP_PRECLASSIFIER_THRESHOLD") or config.get("threshold")
+    if threshold is None:
+        logging.warning("Pre-classifier has no calibrated threshold; run pre_classifier.py calibrate. Escalating everything.")
+        return None
+    if float(threshold) > 1:
+        return None
+    return PreClassifier(encoder, config["categories"], float(threshold))
+
+
+if __name__ == "__main__":
+    # Calibrate the threshold on held-out photos and optionally store it in the examples file
+    parser = argparse.ArgumentParser(description="Calibrate the pre-classifier threshold on held-out photos.")
+    parser.add_argument("held_out", help="directory with one sub-directory of photos per category name, plus 'other'")
+    parser.add_argument("--examples", default=EXAMPLES_PATH)
+    parser.add_argument("--precision", type=float, default=0.98, help="required share of correct local answers")
+    parser.add_argument("--write", action="store_true", help="save the threshold into the examples file")
+    args = parser.parse_args()
+
+    encoder = encoder_from_env()
+    if encoder is None:
+        raise SystemExit("Set SCRAP_PRECLASSIFIER_MODEL to an ONNX image encoder first.")
+    config = PreClassifier.read_examples(args.examples)
+    result = calibrate(PreClassifier(encoder, config["categories"], threshold=1.0), args.held_out, args.precision)
+    if result["threshold"] is None:
+        raise SystemExit(f"No threshold reaches {args.precision:.0%} precision on {result['photos']} photos; "
+                         f"add more examples per category.")
+    print(f"threshold {result['threshold']:.4f}: {result['coverage']:.0%} of {result['photos']} held-out photos "
+          f"answered locally at {result['precision']:.1%} precision")
+    if args.write:
+        with open(args.examples) as f:
+            stored = json.load(f)
+        stored["threshold"] = round(result["threshold"], 4)
+        with open(args.examples, "w") as f:
+            json.dump(stored, f, indent=2)
+            f.write("\n")
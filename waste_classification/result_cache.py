@@ -0,0 +1,286 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from PIL import Image
+
+
+def dhash(image: Image.Image, size: int = 8) -> int:
+    """64-bit difference hash: near-identical photos differ in only a few bits."""
+    # Each bit says whether a pixel is brighter than its right neighbour on a 9x8 thumbnail
+    small = image.convert("L").resize((size + 1, size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def _to_signed(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+# Set bits per byte value, for popcounts on NumPy versions without np.bitwise_count
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _POPCOUNT[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class ClassificationCache:
+    """Disk-backed cache of model answers keyed by image dHash, state and prompt version.
+
+    A lookup matches the closest stored hash within ``max_distance`` differing bits, so a
+    re-taken photo of the same item still hits. Entries expire after ``ttl`` seconds and
+    the least recently used ones are evicted beyond ``max_entries``.
+
+    The hashes of each namespace are kept in memory as NumPy arrays, so a lookup is one
+    vectorised XOR and popcount and only the matching answer is read from SQLite. Rows
+    added by other processes sharing the file are picked up on the next lookup. Eviction
+    runs in batches once the table is ``evict_margin`` over the cap.
+    """
+
+    def __init__(self, path: str = "scrap_cache.db", max_distance: int = 6, ttl: float = 30 * 24 * 3600,
+                 max_entries: int = 10_000, evict_margin: float = 0.1):
+        self.path = path
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evict_margin = evict_margin
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "near_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        # namespace -> {"ids", "hashes", "created"} arrays, and the highest row id loaded into them
+        self._index: Dict[str, Dict[str, np.ndarray]] = {}
+        self._loaded_id = 0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL a crash can lose the last commits but never corrupts the file; fine for a cache
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS classifications ("
+            "id INTEGER PRIMARY KEY, namespace TEXT NOT NULL, phash INTEGER NOT NULL, "
+            "answer TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS classifications_namespace ON classifications (namespace)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS classifications_last_used ON classifications (last_used)")
+        self._conn.commit()
+        with self._lock:
+            self._evict(time.time())
+
+    @staticmethod
+    def _namespace(state: str, prompt_version: str) -> str:
+        return f"{prompt_version}|{state}"
+
+    def _refresh(self):
+        """Add rows written since the last refresh (by this or another process) to the index."""
+        rows = self._conn.execute(
+            "SELECT id, namespace, phash, created FROM classifications WHERE id > ? ORDER BY id",
+            (self._loaded_id,),
+        ).fetchall()
+        if not rows:
+            return
+        self._loaded_id = rows[-1][0]
+        by_namespace = {}
+        for entry_id, namespace, phash, created in rows:
+            by_namespace.setdefault(namespace, []).append((entry_id, phash, created))
+        for namespace, entries in by_namespace.items():
+            ids, phashes, created = zip(*entries)
+            new = {"ids": np.array(ids, dtype=np.int64),
+                   "hashes": np.array(phashes, dtype=np.int64).view(np.uint64),
+                   "created": np.array(created, dtype=np.float64)}
+            old = self._index.get(namespace)
+            self._index[namespace] = new if old is None else {key: np.concatenate([old[key], new[key]]) for key in new}
+
+    def _forget(self, namespace: str, entry_ids: np.ndarray):
+        entries = self._index[namespace]
+        keep = ~np.isin(entries["ids"], entry_ids)
+        self._index[namespace] = {key: values[keep] for key, values in entries.items()}
+
+    def get(self, image_hash: int, state: str, prompt_version: str) -> Optional[str]:
+        """Cached answer for the nearest matching image, or None."""
+        now = time.time()
+        namespace = self._namespace(state, prompt_version)
+        with self._lock:
+            self._refresh()
+            entries = self._index.get(namespace)
+            answer = None
+            while entries is not None and len(entries["ids"]):
+                distances = _popcount(entries["hashes"] ^ np.uint64(image_hash)).astype(np.int64)
+                distances[entries["created"] < now - self.ttl] = self.max_distance + 1
+                best = int(np.argmin(distances))
+                if distances[best] > self.max_distance:
+                    break
+                entry_id = int(entries["ids"][best])
+                row = self._conn.execute("SELECT answer FROM classifications WHERE id = ?", (entry_id,)).fetchone()
+                if row is None:
+                    # Evicted by another process; drop it and try the next closest
+                    self._forget(namespace, np.array([entry_id]))
+                    entries = self._index[namespace]
+                    continue
+                answer = row[0]
+                with self._conn:
+                    self._conn.execute("UPDATE classifications SET last_used = ? WHERE id = ?", (now, entry_id))
+                break
+
+            if answer is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            if distances[best]:
+                self._stats["near_hits"] += 1
+            return answer
+
+    def put(self, image_hash: int, state: str, prompt_version: str, answer: str):
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO classifications (namespace, phash, answer, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (self._namespace(state, prompt_version), _to_signed(image_hash), answer, now, now),
+                )
+            self._stats["stores"] += 1
+            self._entries += 1
+            if self._entries > self.max_entries * (1 + self.evict_margin):
+                self._evict(now)
+
+    def _evict(self, now: float):
+        """Drop expired entries and the least recently used ones beyond the cap, then rebuild the index."""
+        with self._conn:
+            expired = self._conn.execute("DELETE FROM classifications WHERE created < ?", (now - self.ttl,))
+            count = self._conn.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+            overflow = self._conn.execute(
+                "DELETE FROM classifications WHERE id IN ("
+                "SELECT id FROM classifications ORDER BY last_used LIMIT ?)",
+                (max(0, count - self.max_entries),),
+            )
+        self._stats["evictions"] += expired.rowcount + overflow.rowcount
+        self._entries = count - overflow.rowcount
+        self._index = {}
+        self._loaded_id = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM classifications")
+            self._entries = 0
+            self._index = {}
+            self._loaded_id = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def cache_from_env() -> Optional[ClassificationCache]:
+    """ClassificationCache configured from SCRAP_CACHE_* variables; SCRAP_CACHE_PATH='' disables it."""
+    path = os.getenv("SCRAP_CACHE_PATH", "scrap_cache.db")
+    if not path:
+        return None
+    return ClassificationCache(
+        path,
+        max_distance=int(os.getenv("SCRAP_CACHE_MAX_DISTANCE", "6")),
+        ttl=float(os.getenv("SCRAP_CACHE_TTL_DAYS", "30")) * 24 * 3600,
+        max_entries=int(os.getenv("SCRAP_CACHE_MAX_ENTRIES", "10000")),
+    )
+
+
+def generate_cached(engine, cache: Optional[ClassificationCache], prompt: str, images: List[Image.Image],
+                    state: str, prompt_version: str, payloads: List = None) -> List[Dict]:
+    """engine.generate_all over [prompt, image] requests, answering repeat items from the cache.
+
+    ``payloads`` optionally replaces the images in the requests (e.g. re-encoded blobs),
+    while the images are still what gets hashed. Returns [{"text", "error", "cached"}] in
+    input order. Only successful answers are stored, and identical images within one
+    batch are sent once.
+    """
+    payloads = images if payloads is None else payloads
+    if cache is None:
+        return [dict(result, cached=False) for result in engine.generate_all([[prompt, payload] for payload in payloads])]
+
+    hashes = [dhash(image) for image in images]
+    results = [None] * len(images)
+    # image hash -> indices of the images waiting for that answer
+    misses = {}
+    for i, image_hash in enumerate(hashes):
+        answer = cache.get(image_hash, state, prompt_version)
+        if answer is not None:
+            results[i] = {"text": answer, "error": None, "cached": True}
+        else:
+            misses.setdefault(image_hash, []).append(i)
+
+    responses = engine.generate_all([[prompt, payloads[indices[0]]] for indices in misses.values()])
+    for (image_hash, indices), response in zip(misses.items(), responses):
+        if response["error"] is None:
+            cache.put(image_hash, state, prompt_version, response["text"])
+        for i in indices:
+            results[i] = dict(response, cached=False)
+    return results
+
+
+def stream_cached(engine, cache: Optional[ClassificationCache], prompt: str, images: List[Image.Image],
+                  state: str, prompt_version: str, payloads: List = None) -> Iterator[Dict]:
+    """Streaming counterpart of generate_cached, yielding events as soon as they happen.
+
+    Events are {"index", "type": "text", "text"} for each streamed piece of an answer
+    and {"index", "type": "done", "text", "error", "cached"} once an image is finished.
+    Cached images finish first; the others finish in whatever order the model answers.
+    """
+    payloads = images if payloads is None else payloads
+    hashes = [dhash(image) for image in images] if cache is not None else list(range(len(images)))
+
+    # image hash -> indices of the images waiting for that answer
+    misses = {}
+    for i, image_hash in enumerate(hashes):
+        answer = cache.get(image_hash, state, prompt_version) if cache is not None else None
+        if answer is not None:
+            yield {"index": i, "type": "done", "text": answer, "error": None, "cached": True}
+        else:
+            misses.setdefault(image_hash, []).append(i)
+
+    # Worker threads only put events on the queue; the caller's thread does all the rendering
+    events = queue.Queue()
+
+    def run(image_hash, payload):
+        try:
+            text = engine.generate_stream([prompt, payload], lambda piece: events.put((image_hash, "text", piece)))
+            events.put((image_hash, "done", text))
+        except Exception as e:
+            events.put((image_hash, "error", f"{type(e).__name__}: {e}"))
+
+    for image_hash, indices in misses.items():
+        engine.submit(run, image_hash, payloads[indices[0]])
+
+    remaining = len(misses)
+    while remaining:
+        image_hash, kind, value = events.get()
+        if kind == "text":
+            for i in misses[image_hash]:
+                yield {"index": i, "type": "text", "text": value}
+            continue
+
+        remaining -= 1
+        if kind == "done" and cache is not None:
+            cache.put(image_hash, state, prompt_version, value)
+        for i in misses[image_hash]:
+            if kind == "done":
+                yield {"index": i, "type": "done", "text": value, "error": None, "cached": False}
+            else:
+                yield {"index": i, "type": "done", "text": None, "error": value, "cached": False}
@@ -0,0 +1,205 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+# google.api_core exception names worth retrying; matched by name so the engine (and the
+# fake model) work without importing the Google client libraries
+TRANSIENT_ERRORS = {
+    "ResourceExhausted",
+    "TooManyRequests",
+    "ServiceUnavailable",
+    "InternalServerError",
+    "DeadlineExceeded",
+    "GatewayTimeout",
+}
+
+
+def is_transient(error: Exception) -> bool:
+    """Errors that a later attempt can succeed on: quota, overload, timeouts, dropped connections."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` requests per second with bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int = 1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self.sleep(wait)
+
+
+class ScrapEngine:
+    """Runs generate_content calls concurrently under the API quota.
+
+    Requests fan out over a thread pool of ``max_concurrency`` workers. Every attempt
+    takes a token from a bucket refilled at ``requests_per_minute``. Transient errors are
+    retried with full-jitter exponential backoff, and each call carries ``timeout`` as
+    its request deadline. Results come back in input order.
+    """
+
+    def __init__(self, model, max_concurrency: int = 4, requests_per_minute: float = 15, burst: int = None,
+                 max_retries: int = 3, backoff_base: float = 1.0, backoff_max: float = 20.0,
+                 timeout: float = 30.0):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst or max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="scrap-engine")
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "attempts": 0, "retries": 0, "failures": 0}
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                self._stats[name] += delta
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _retrying(self, call, can_retry=lambda: True):
+        """Run call() under the rate limit, retrying transient errors with jittered backoff."""
+        self._count(requests=1)
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            self._count(attempts=1)
+            try:
+                return call()
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient(e) or not can_retry():
+                    self._count(failures=1)
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                logging.warning(f"generate_content failed ({type(e).__name__}: {e}); retrying in {delay:.1f}s")
+                self._count(retries=1)
+                time.sleep(delay)
+
+    def generate(self, contents, **kwargs):
+        """One generate_content call with rate limiting, timeout and retries; returns the response."""
+        return self._retrying(
+            lambda: self.model.generate_content(contents, request_options={"timeout": self.timeout}, **kwargs)
+        )
+
+    def generate_stream(self, contents, on_text) -> str:
+        """Streaming generate_content: on_text(chunk) is called as text arrives; returns the full text."""
+        received = []
+
+        def call():
+            response = self.model.generate_content(contents, stream=True, request_options={"timeout": self.timeout})
+            for chunk in response:
+                received.append(chunk.text)
+                on_text(chunk.text)
+            return "".join(received)
+
+        # Text already shown cannot be taken back, so only failures before the first chunk are retried
+        return self._retrying(call, can_retry=lambda: not received)
+
+    def submit(self, fn, *args):
+        """Run fn(*args) on the engine's worker threads."""
+        return self._executor.submit(fn, *args)
+
+    def generate_all(self, requests: List[list]) -> List[Dict]:
+        """Run every request concurrently; returns [{"text", "error"}] in input order.
+
+        A request that still fails after its retries gets ``error`` set instead of
+        failing the whole batch.
+        """
+        futures = [self._executor.submit(self.generate, contents) for contents in requests]
+        results = []
+        for future in futures:
+            try:
+                results.append({"text": future.result().text, "error": None})
+            except Exception as e:
+                results.append({"text": None, "error": f"{type(e).__name__}: {e}"})
+        return results
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+def engine_from_env(model) -> ScrapEngine:
+    """ScrapEngine configured from SCRAP_* environment variables."""
+    return ScrapEngine(
+        model,
+        max_concurrency=int(os.getenv("SCRAP_CONCURRENCY", "4")),
+        requests_per_minute=float(os.getenv("SCRAP_REQUESTS_PER_MINUTE", "15")),
+        max_retries=int(os.getenv("SCRAP_MAX_RETRIES", "3")),
+        timeout=float(os.getenv("SCRAP_TIMEOUT", "30")),
+    )
+
+
+def model_from_env():
+    """Model named by SCRAP_BACKEND: "gemini" (needs API_KEY) or "fake" for tests and load runs.
+
+    The fake's round trip and failure rate come from SCRAP_FAKE_LATENCY and SCRAP_FAKE_FAILURE_RATE.
+    """
+    backend = os.getenv("SCRAP_BACKEND", "gemini")
+    if backend == "fake":
+        from fake_model import FakeGenerativeModel
+
+        return FakeGenerativeModel(latency=float(os.getenv("SCRAP_FAKE_LATENCY", "0.5")),
+                                   failure_rate=float(os.getenv("SCRAP_FAKE_FAILURE_RATE", "0")))
+    if backend != "gemini":
+        raise ValueError(f"Unknown SCRAP_BACKEND: {backend!r} (expected 'gemini' or 'fake')")
+
+    import google.generativeai as genai
+
+    api_key = os.getenv("API_KEY")
+    if not api_key:
+        raise ValueError("API_KEY not found. Please set it in the .env file or as an environment variable.")
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel("gemini-1.5-flash")
+
+
+if __name__ == "__main__":
+    # Sequential vs. concurrent timing against the fake model, no API key needed
+    import argparse
+
+    from fake_model import FakeGenerativeModel
+
+    parser = argparse.ArgumentParser(description="Time the scrap engine against a fake Gemini model.")
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.5, help="mean fake round trip in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rpm", type=float, default=600)
+    args = parser.parse_args()
+
+    requests = [[f"prompt {i}", f"image {i}"] for i in range(args.images)]
+    for concurrency in (1, args.concurrency):
+        model = FakeGenerativeModel(latency=args.latency, failure_rate=args.failure_rate, seed=0)
+        engine = ScrapEngine(model, max_concurrency=concurrency, requests_per_minute=args.rpm,
+                             backoff_base=0.1, timeout=5 * args.latency)
+        start = time.perf_counter()
+        results = engine.generate_all(requests)
+        elapsed = time.perf_counter() - start
+        engine.shutdown()
+        failed = sum(result["error"] is not None for result in results)
+        print(f"concurrency={concurrency}: {args.images} images in {elapsed:.2f}s, "
+              f"{failed} failed, stats={engine.stats()}")
@@ -1,27 +1,42 @@
-import google.generativeai as genai
+import argparse
+import mimetypes
 import os
 import logging
+import time
 import geocoder
-from PIL import Image
 from typing import Dict, List
 
-os.environ["API_KEY"] = "HeyUseYourApi"
-genai.configure(api_key=os.environ["API_KEY"])
+from pre_classifier import describe, pre_classifier_from_env
+from preprocess import preprocess_many, summarize
+from result_cache import cache_from_env, generate_cached
+from scrap_engine import engine_from_env, model_from_env
 
-model = genai.GenerativeModel("gemini-1.5-flash")
+# A key from the environment wins over the placeholder
+os.environ.setdefault("API_KEY", "HeyUseYourApi")
+
+# Gemini unless SCRAP_BACKEND=fake
+model = model_from_env()
+engine = engine_from_env(model)
+cache = cache_from_env()
+pre_classifier = pre_classifier_from_env()
+
+# Bump whenever the classify_scrap prompt changes so cached answers are not reused
+PROMPT_VERSION = "info-1"
 
 
 class LocationService:
     """Handle location-related operations"""
 
     @staticmethod
-    def get_location() -> Dict[str, str]:
-        """Get user's location with fallback options"""
+    def get_location(prompt: bool = True) -> Dict[str, str]:
+        """Get user's location with fallback options; prompt=False goes straight to IP geolocation"""
         try:
-            # Try manual input first
-            print("\nEnter location details (press Enter to use IP geolocation):")
-            city = input("City (or press Enter): ").strip()
-            state = input("State (or press Enter): ").strip()
+            city = state = ""
+            if prompt:
+                # Try manual input first
+                print("\nEnter location details (press Enter to use IP geolocation):")
+                city = input("City (or press Enter): ").strip()
+                state = input("State (or press Enter): ").strip()
 
             if city and state:
                 logging.info(f"Using manual location input: {city}, {state}")
@@ -130,54 +145,111 @@ def classify_scrap(images: List[str], location: Dict[str, str]):
     Returns:
     list: A list of dictionaries containing classification and recommendations
     """
-    classifications = []
-
     # Get the state from the location
     state = location.get("state", "Maharashtra")  # Default to Maharashtra if state is not found
 
-    for image_path in images:
-        # Open the image file
-        image = Image.open(image_path)
+    # Prepare the prompt with location-specific information
+    prompt = f"""
+    This image shows an item the user wishes to sell to a local scrap collector in {state}, India. Based on the object in the image, classify:
 
-        # Prepare the prompt with location-specific information
-        prompt = f"""
-        This image shows an item the user wishes to sell to a local scrap collector in {state}, India. Based on the object in the image, classify:
+    1. Whether this item is recyclable according to {state} recycling guidelines.
+    2. If the item can be sold to a scrap collector or has potential resale value.
+    3. Specific recommendations on how the user should prepare this item before handing it over to the vendor, such as cleaning, drying, or segregating it to maximize resale value and ensure compliance with local recycling rules.
+    4. Practical advice on safe handling and storage of this item at home, considering {state} regulations on waste management.
 
-        1. Whether this item is recyclable according to {state} recycling guidelines.
-        2. If the item can be sold to a scrap collector or has potential resale value.
-        3. Specific recommendations on how the user should prepare this item before handing it over to the vendor, such as cleaning, drying, or segregating it to maximize resale value and ensure compliance with local recycling rules.
-        4. Practical advice on safe handling and storage of this item at home, considering {state} regulations on waste management.
+    Ensure that the response is straightforward and useful for the user, offering clear steps for handling this item in preparation for local collection.
+    """
+
+    # Downscale and re-encode before upload; full-resolution photos are mostly wasted bytes.
+    # An image that cannot be decoded fails on its own, like a failed model call
+    prepared = preprocess_many(images, return_exceptions=True)
+    responses = {i: {"text": None, "error": f"Could not read image: {type(p).__name__}: {p}", "cached": False}
+                 for i, p in enumerate(prepared) if isinstance(p, Exception)}
+    readable = [i for i in range(len(images)) if i not in responses]
+    summary = summarize([prepared[i] for i in readable])
+    logging.info(f"Preprocessed {summary['images']} images in {summary['seconds']:.2f}s, "
+                 f"saved {summary['saved_bytes']} of {summary['original_bytes']} bytes")
 
-        Ensure that the response is straightforward and useful for the user, offering clear steps for handling this item in preparation for local collection.
-        """
+    recycling_rules = RECYCLING_RULES.get(state, "No specific rules found for this state.")
+    # Obvious items are answered on the CPU by the pre-classifier; only the rest go to the model
+    local = [None] * len(images)
+    if pre_classifier:
+        for i, answer in zip(readable, pre_classifier.classify([prepared[i].image for i in readable])):
+            local[i] = answer
+    escalated = [i for i in readable if local[i] is None]
 
-        # Generate classification and recommendation using text-and-image input
-        response = model.generate_content([prompt, image])
+    # Generate classification and recommendation using text-and-image input, all images concurrently;
+    # items seen before are answered from the cache
+    start = time.perf_counter()
+    generated = generate_cached(engine, cache, prompt, [prepared[i].image for i in escalated], state, PROMPT_VERSION,
+                                payloads=[prepared[i].blob() for i in escalated])
+    if pre_classifier:
+        pre_classifier.record_escalation(time.perf_counter() - start, sum(not r["cached"] for r in generated))
+    responses.update(zip(escalated, generated))
+
+    classifications = []
+    for i, image_path in enumerate(images):
+        if local[i] is not None:
+            label = local[i]["label"]
+            classifications.append({
+                "image": image_path,
+                "recyclable": label["recyclable"],
+                "sellable": label["sellable"],
+                "recommendation": describe(label, state),
+                "error": None,
+                "cached": False,
+                "local": True,
+                "recycling_rules": recycling_rules
+            })
+            continue
+
+        response = responses[i]
+        text = response["text"] or ""
 
         # Parse the response and store it in the results list
         classifications.append({
             "image": image_path,
-            "recyclable": "recyclable" in response.text.lower(),
-            "sellable": "sellable" in response.text.lower(),
-            "recommendation": response.text,
-            "recycling_rules": RECYCLING_RULES.get(state, "No specific rules found for this state.")
+            "recyclable": "recyclable" in text.lower(),
+            "sellable": "sellable" in text.lower(),
+            "recommendation": text or f"Classification failed: {response['error']}",
+            "error": response["error"],
+            "cached": response["cached"],
+            "local": False,
+            "recycling_rules": recycling_rules
         })
 
     return classifications
 
 
-# Example usage
+# Example usage; use batch_classify.py for whole directories
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classify scrap images for a state's recycling rules.")
+    parser.add_argument("images", nargs="*", default=["iron1.jpg", "cell_phone.webp", "ttp2.jpg"])
+    parser.add_argument("--city", help="skip location detection (together with --state)")
+    parser.add_argument("--state", help="skip location detection")
+    parser.add_argument("--ask-location", action="store_true", help="prompt for the location instead of using IP geolocation")
+    parser.add_argument("--service", metavar="URL", help="submit the images to a running job_service instead of classifying here")
+    args = parser.parse_args()
+
     logging.basicConfig(level=logging.INFO)
 
     # Get the user's location
-    location = LocationService.get_location()
-
-    # Example images to classify
-    images = ["iron1.jpg","cell_phone.webp","ttp2.jpg"] #Replace with actual image paths
+    if args.state:
+        location = {"city": args.city or "Unknown", "state": args.state, "country": "India"}
+    else:
+        location = LocationService.get_location(prompt=args.ask_location)
 
     # Classify scrap based on the images and user's location
-    classifications = classify_scrap(images, location)
+    if args.service:
+        from job_client import ScrapJobClient
+
+        uploads = []
+        for path in args.images:
+            with open(path, "rb") as f:
+                uploads.append((path, f.read(), mimetypes.guess_type(path)[0] or "application/octet-stream"))
+        classifications = ScrapJobClient(args.service).classify(uploads, location)
+    else:
+        classifications = classify_scrap(args.images, location)
 
     # Output the results
     for result in classifications:
@@ -185,3 +257,8 @@ if __name__ == "__main__":
         print(f"Recyclable: {result['recyclable']}")
         print(f"Recommendation: {result['recommendation']}")
         print(f"Recycling Rules: {result['recycling_rules']}\n")
+
+    if pre_classifier and not args.service:
+        stats = pre_classifier.stats()
+        print(f"Pre-classifier: {stats['local']} answered locally, {stats['escalated']} escalated "
+              f"({stats['escalation_rate']:.0%}), about {stats['latency_saved_seconds']:.1f}s saved")